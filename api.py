@@ -1,18 +1,81 @@
 import os
 import asyncio
-import shutil
-import uuid
 import json
-from typing import Optional
-from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Depends
-from fastapi.responses import FileResponse, StreamingResponse
+import logging
+import time
+from contextlib import asynccontextmanager
+import zipfile
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
-import pdfplumber
-from main import process_bank_statement_pdf
+from main import aprocess_bank_statement_pdf, aprocess_batch, cache_version, open_document
+import worker_pool
+import bank_registry
+from bank_detection import AUTO
+import uploads
+import exporters
+import serializer
+import compression
+import logs
+import metrics
+from records import DocumentInfo, PageResult
+from result_cache import ResultCache, PageCache, cache_key
 
 from config import config
+from jobs import JobStore, JobRunner, DecryptionFailed, stream_job
 
-app = FastAPI()
+logs.setup()
+log = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clear uploads orphaned by a previous crash
+    await asyncio.to_thread(uploads.sweep_stale_uploads)
+    # One pre-warmed parser pool per server process, shared by every /parse request
+    await asyncio.to_thread(worker_pool.start)
+    global job_runner
+    if job_store is not None:
+        job_runner = JobRunner(job_store, stream_parse)
+        job_runner.start()
+    metrics_task = asyncio.create_task(save_metrics()) if config.METRICS_ENABLED else None
+    try:
+        yield
+    finally:
+        if metrics_task is not None:
+            metrics_task.cancel()
+            await asyncio.gather(metrics_task, return_exceptions=True)
+            await asyncio.to_thread(metrics.save, METRICS_DIR, True)
+        if job_runner is not None:
+            await job_runner.stop()
+            job_runner = None
+        await asyncio.to_thread(worker_pool.shutdown)
+
+async def save_metrics():
+    # Every server process publishes its metrics for /metrics in the others
+    while True:
+        await asyncio.sleep(config.METRICS_FLUSH_INTERVAL)
+        await asyncio.to_thread(metrics.save, METRICS_DIR)
+
+app = FastAPI(lifespan=lifespan)
+
+# Multipart framing on top of the PDF itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads from the Content-Length header, before the body is read
+    content_length = request.headers.get("content-length")
+    max_bytes = config.BATCH_MAX_BYTES if request.url.path == "/parse/batch" else config.UPLOAD_MAX_BYTES
+    if (
+        (request.url.path.startswith("/parse") or request.url.path == "/jobs")
+        and content_length
+        and content_length.isdigit()
+        and max_bytes
+        and int(content_length) > max_bytes + UPLOAD_OVERHEAD_BYTES
+    ):
+        return JSONResponse(status_code=413, content={"detail": "Upload too large"})
+    return await call_next(request)
 
 # API Key from configuration
 API_KEY = config.API_KEY
@@ -26,6 +89,15 @@ def verify_api_key(x_api_key: str = Header(...)):
 RESULTS_DIR = "results"
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+result_cache = ResultCache(os.path.join(RESULTS_DIR, "cache")) if config.RESULT_CACHE_ENABLED else None
+page_cache = (
+    PageCache(os.path.join(RESULTS_DIR, "pages"), max_bytes=config.PAGE_CACHE_MAX_BYTES)
+    if config.PAGE_CACHE_ENABLED else None
+)
+job_store = JobStore(os.path.join(RESULTS_DIR, "jobs")) if config.JOBS_ENABLED else None
+job_runner = None
+METRICS_DIR = os.path.join(RESULTS_DIR, "metrics")
+
 @app.get("/")
 async def root():
     return {"message": "Python Scraper is Alive! 🐍", "status": "running"}
@@ -34,59 +106,444 @@ async def root():
 async def health():
     return {"status": "ok", "service": "python-scraper"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus metrics of every server process: stage timings by bank, page /
+    transaction / error counters and in-flight gauges.
+    """
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    text = await asyncio.to_thread(metrics.render, METRICS_DIR)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/banks")
+async def list_banks():
+    return {"banks": bank_registry.available_banks()}
+
+async def open_for_parse(upload, bank_name, password):
+    """
+    Open + decrypt the upload once (off the event loop) and settle the bank:
+    "AUTO" / unknown names are detected from page 1, once, before any table
+    extraction (main.open_document).
+    Returns (session or None, bank to parse with, page count, timings, error),
+    timings holding the seconds taken to open and (if it ran) detect; both are
+    also recorded in the metrics. error is the page 0 record to report instead
+    of parsing when the document can't be parsed: it could not be opened (e.g.
+    a wrong or missing password) or the bank detected; the session is then None.
+    """
+    session, info, error = await asyncio.to_thread(open_document, upload.source, bank_name, password)
+    for stage, seconds in info.timings.items():
+        metrics.STAGE_SECONDS.observe(seconds, bank=info.bank_name, stage=stage)
+    return session, info.bank_name, info.page_count, info.timings, error
+
+def build_metadata(filename, bank_name, parse_bank, page_count, timings=None, error=False):
+    """
+    The metadata line; its status is "error" when the document's page 0 error
+    record follows instead of its pages.
+    """
+    metadata = {
+        "type": "metadata",
+        "status": "error" if error else "success",
+        "bank": parse_bank,
+        "documentmetadata": {
+            "filename": filename,
+            "page_count": page_count,
+        }
+    }
+    if parse_bank != bank_name:
+        metadata["detected"] = True
+    if timings:
+        metadata["timings"] = {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+    return metadata
+
+def encode_page(page_result, bank, file_id=None, timings=False):
+    """
+    The page_data line of a page, counted in the metrics with its encoding time.
+    """
+    start = time.perf_counter()
+    line = serializer.page_line(page_result, file_id, timings)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - start, bank=bank, stage="serialize")
+    metrics.observe_page(bank, page_result)
+    return line
+
+def stream_response(request, chunks, media_type, headers=None, compressible=True, compression_stats=False):
+    """
+    StreamingResponse of `chunks`, coalesced into larger writes and compressed
+    when the client accepts gzip / zstd. With `compression_stats`, a compressed
+    NDJSON stream ends with a {"type": "compression"} record reporting the
+    ratio; otherwise the ratio is only logged and counted in the metrics.
+    """
+    headers = dict(headers or {})
+    body = serializer.coalesce(chunks)
+    if compressible:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = compression.negotiate(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            summary = compression_stats and media_type == "application/x-ndjson"
+            body = compression.compress_stream(body, encoding, summary=summary)
+            headers["Content-Encoding"] = encoding
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+def replay_cached(cached_lines, filename, file_id=None):
+    """
+    NDJSON lines of a cached parse, with the metadata patched for this request.
+    """
+    metadata = serializer.loads(cached_lines[0])
+    metadata["documentmetadata"]["filename"] = filename
+    metadata["cached"] = True
+    if file_id is None:
+        yield serializer.line(metadata)
+        yield from cached_lines[1:]
+        return
+    metadata["file_id"] = file_id
+    yield serializer.line(metadata)
+    for line in cached_lines[1:]:
+        page_result = serializer.loads(line)
+        page_result["file_id"] = file_id
+        yield serializer.line(page_result)
+
+async def stream_parse(upload, filename, bank_name, password, timings=False):
+    """
+    NDJSON lines (bytes) of one parse: the metadata line, then one line per page.
+    Replays the result cache when this exact statement was parsed before,
+    otherwise parses it and fills the cache. The caller owns `upload`.
+    With `timings`, the metadata and page lines carry stage timings in ms
+    (never cached; a replayed parse has none).
+    """
+    key = None
+    if result_cache is not None:
+        key = cache_key(upload.sha256, bank_name, cache_version(), password)
+        cached_lines = await asyncio.to_thread(result_cache.lookup, key)
+        if cached_lines:
+            # Same statement parsed before: replay it without touching the PDF
+            log.info("♻️ Result cache hit for %s", filename)
+            for line in replay_cached(cached_lines, filename):
+                yield line
+            return
+
+    session = None
+    cache_writer = None
+    try:
+        # Open + decrypt once; the same session is parsed below
+        session, parse_bank, page_count, open_timings, error = await open_for_parse(upload, bank_name, password)
+
+        # Yield Metadata first
+        failed = error is not None
+        metadata = build_metadata(filename, bank_name, parse_bank, page_count, error=failed)
+        metadata_line = serializer.line(metadata)
+        if timings and open_timings:
+            yield serializer.line(
+                build_metadata(filename, bank_name, parse_bank, page_count, open_timings, error=failed)
+            )
+        else:
+            yield metadata_line
+        if error is not None:
+            yield encode_page(error, parse_bank, timings=timings)
+            return
+
+        if result_cache is not None:
+            cache_writer = result_cache.writer(key)
+            cache_writer.write(metadata_line)
+
+        # Yield transactions page-by-page
+        async for page_result in aprocess_bank_statement_pdf(
+            session, bank_name=parse_bank, password=password,
+            executor=worker_pool.get_pool(), page_cache=page_cache
+        ):
+            line = encode_page(page_result, parse_bank, timings=timings)
+            if cache_writer is not None:
+                if page_result.error is not None:
+                    # Never cache a partial/failed parse
+                    cache_writer.abort()
+                    cache_writer = None
+                else:
+                    cache_writer.write(serializer.page_line(page_result) if timings else line)
+            # Pages arrive through an asyncio queue, so the event loop is already
+            # free while the next one is extracted; no need to sleep between pages
+            yield line
+
+        if cache_writer is not None:
+            await asyncio.to_thread(cache_writer.commit)
+            cache_writer = None
+
+    except Exception as e:
+        metrics.ERRORS.inc(bank=bank_name, kind="document")
+        yield serializer.line({"type": "error", "message": str(e)})
+    finally:
+        if cache_writer is not None:
+            cache_writer.abort()
+        if session is not None:
+            session.close()
+
+async def _single(page_result):
+    yield page_result
+
+async def stream_export(upload, bank_name, password, exporter):
+    """
+    The statement's transactions in a columnar format (exporters.py), written
+    out as pages complete. Built from the parsed records rather than NDJSON,
+    so the result cache is not used; the page cache still is.
+    """
+    session = None
+    try:
+        session, parse_bank, _, _, error = await open_for_parse(upload, bank_name, password)
+        if error is not None:
+            page_results = _single(error)
+        else:
+            page_results = aprocess_bank_statement_pdf(
+                session, bank_name=parse_bank, password=password,
+                executor=worker_pool.get_pool(), page_cache=page_cache
+            )
+        async for page_result in page_results:
+            start = time.perf_counter()
+            chunk = exporter.write_page(page_result)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - start, bank=parse_bank, stage="serialize")
+            metrics.observe_page(parse_bank, page_result)
+            if chunk:
+                yield chunk
+    except Exception as e:
+        metrics.ERRORS.inc(bank=bank_name, kind="document")
+        chunk = exporter.write_page(PageResult(0, error=str(e)))
+        if chunk:
+            yield chunk
+    finally:
+        if session is not None:
+            session.close()
+    yield exporter.close()
+
 @app.post("/parse")
 async def parse_bank_statement(
+    request: Request,
     file: UploadFile = File(...),
-    bank_name: str = Form("UNION BANK OF INDIA"),
+    bank_name: str = Form(AUTO),
     password: Optional[str] = Form(None),
+    output_format: str = Form("ndjson"),
+    timings: bool = Form(False),
+    compression_stats: bool = Form(False),
     x_api_key: str = Depends(verify_api_key)
 ):
-    # Save temp file
-    temp_filename = f"temp_{uuid.uuid4()}_{file.filename}"
-    with open(temp_filename, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    """
+    output_format: "ndjson" (metadata + page_data lines), or one row per
+    transaction as "csv", "parquet" or "arrow" (IPC stream; these two need pyarrow).
+    timings: add per-stage timings in ms to the NDJSON metadata and page records.
+    compression_stats: end a compressed NDJSON stream with a {"type": "compression"} record.
+    """
+    output_format = output_format.lower()
+    exporter = None
+    if output_format != "ndjson":
+        try:
+            exporter = exporters.get_exporter(output_format)
+        except exporters.ExportUnavailable as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Small files stay in memory, larger ones are streamed to UPLOAD_TMP_DIR
+    try:
+        upload = await uploads.ingest_upload(file)
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
     async def result_generator():
+        metrics.PARSES_IN_FLIGHT.inc(endpoint="parse")
         try:
-            # Get Page Count first
-            page_count = 0
-            try:
-                with pdfplumber.open(temp_filename, password=password) as pdf:
-                    page_count = len(pdf.pages)
-            except Exception as e:
-                print(f"Error reading page count: {e}")
-
-            # Yield Metadata first
-            metadata = {
-                "type": "metadata",
-                "status": "success",
-                "bank": bank_name,
-                "documentmetadata": {
-                    "filename": file.filename,
-                    "page_count": page_count,
-                }
-            }
-            yield json.dumps(metadata) + "\n"
-
-            # Yield transactions page-by-page
-            for page_result in process_bank_statement_pdf(temp_filename, bank_name=bank_name, password=password):
-                page_result["type"] = "page_data"
-                yield json.dumps(page_result) + "\n"
-                # Important: Allow heartbeats/other tasks to run during intensive parsing
-                await asyncio.sleep(0.01)
+            if exporter is None:
+                async for line in stream_parse(upload, file.filename, bank_name, password, timings):
+                    yield line
+            else:
+                async for chunk in stream_export(upload, bank_name, password, exporter):
+                    yield chunk
+        finally:
+            metrics.PARSES_IN_FLIGHT.dec(endpoint="parse")
+            # Cleanup temp PDF / in-memory buffer
+            upload.cleanup()
+
+    extension, media_type = exporters.FORMATS[output_format]
+    headers = {}
+    if exporter is not None:
+        stem = os.path.splitext(os.path.basename(file.filename or "statement"))[0] or "statement"
+        headers["Content-Disposition"] = f'attachment; filename="{stem}.{extension}"'
+    # Parquet pages are zstd-compressed already
+    return stream_response(
+        request, result_generator(), media_type, headers, compressible=output_format != "parquet",
+        compression_stats=compression_stats,
+    )
+
+@app.post("/parse/batch")
+async def parse_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    bank_name: str = Form(AUTO),
+    password: Optional[str] = Form(None),
+    options: Optional[str] = Form(None),
+    timings: bool = Form(False),
+    compression_stats: bool = Form(False),
+    x_api_key: str = Depends(verify_api_key)
+):
+    """
+    Parse several statements in one request: PDFs and/or zips of PDFs.
+    `options` is an optional JSON object keyed by filename (zip member path)
+    overriding bank_name / password per file, e.g.
+    {"jan.pdf": {"bank_name": "HDFC BANK"}, "feb.pdf": {"password": "x"}}.
+    Pages of all files are scheduled on the shared parser pool together and
+    streamed back as one NDJSON stream; every line carries its `file_id`.
+    `timings` and `compression_stats` work as in /parse.
+    """
+    try:
+        per_file = json.loads(options) if options else {}
+    except ValueError:
+        per_file = None
+    if not isinstance(per_file, dict):
+        raise HTTPException(status_code=400, detail="options must be a JSON object keyed by filename")
+
+    ingested = []
+    try:
+        for file in files:
+            upload = await uploads.ingest_upload(file)
+            if await asyncio.to_thread(uploads.is_zip, upload):
+                try:
+                    # The batch byte limit is enforced while members are inflated
+                    ingested.extend(await asyncio.to_thread(
+                        uploads.ingest_zip, upload, used_bytes=sum(u.size for _, u in ingested)
+                    ))
+                finally:
+                    upload.cleanup()
+            else:
+                ingested.append((file.filename, upload))
+            if len(ingested) > config.BATCH_MAX_FILES:
+                raise uploads.UploadTooLarge(f"Batch exceeds the {config.BATCH_MAX_FILES} file limit")
+            if config.BATCH_MAX_BYTES and sum(u.size for _, u in ingested) > config.BATCH_MAX_BYTES:
+                raise uploads.UploadTooLarge(f"Batch exceeds the {config.BATCH_MAX_BYTES} byte limit")
+    except (uploads.UploadTooLarge, zipfile.BadZipFile) as e:
+        for _, upload in ingested:
+            upload.cleanup()
+        status = 413 if isinstance(e, uploads.UploadTooLarge) else 400
+        raise HTTPException(status_code=status, detail=str(e))
+
+    async def batch_generator():
+        writers = {}
+        banks = {}
+        # file_id -> (filename, requested bank, result cache key) of the files to parse
+        requested = {}
+        metrics.PARSES_IN_FLIGHT.inc(len(ingested), endpoint="batch")
+        try:
+            documents = []
+            for file_id, (filename, upload) in enumerate(ingested):
+                file_options = per_file.get(filename) or {}
+                file_bank = file_options.get("bank_name", bank_name)
+                file_password = file_options.get("password", password)
+
+                key = None
+                if result_cache is not None:
+                    key = cache_key(upload.sha256, file_bank, cache_version(), file_password)
+                    cached_lines = await asyncio.to_thread(result_cache.lookup, key)
+                    if cached_lines:
+                        log.info("♻️ Result cache hit for %s", filename)
+                        for line in replay_cached(cached_lines, filename, file_id):
+                            yield line
+                        continue
+
+                # Opened (and the bank detected) only when the pool gets to the file
+                requested[file_id] = (filename, file_bank, key)
+                documents.append((file_id, upload.source, file_bank, file_password))
+
+            async for file_id, item in aprocess_batch(
+                documents, executor=worker_pool.get_pool(), page_cache=page_cache
+            ):
+                if isinstance(item, DocumentInfo):
+                    # The file was just opened: its metadata goes out ahead of its pages
+                    filename, file_bank, key = requested[file_id]
+                    parse_bank = banks[file_id] = item.bank_name
+                    for stage, seconds in item.timings.items():
+                        metrics.STAGE_SECONDS.observe(seconds, bank=parse_bank, stage=stage)
+                    failed = item.error is not None
+                    metadata = build_metadata(filename, file_bank, parse_bank, item.page_count, error=failed)
+                    if key is not None and not failed:
+                        writers[file_id] = result_cache.writer(key)
+                        writers[file_id].write(serializer.line(metadata))
+                    if timings:
+                        metadata = build_metadata(
+                            filename, file_bank, parse_bank, item.page_count, item.timings, error=failed
+                        )
+                    metadata["file_id"] = file_id
+                    yield serializer.line(metadata)
+                    continue
+
+                page_result = item
+                writer = writers.get(file_id)
+                if writer is not None:
+                    if page_result.error is not None:
+                        # Never cache a partial/failed parse
+                        writers.pop(file_id).abort()
+                    else:
+                        writer.write(serializer.page_line(page_result))
+                yield encode_page(page_result, banks[file_id], file_id, timings)
+
+            for file_id in list(writers):
+                await asyncio.to_thread(writers.pop(file_id).commit)
 
         except Exception as e:
-            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+            metrics.ERRORS.inc(bank=bank_name, kind="document")
+            yield serializer.line({"type": "error", "message": str(e)})
         finally:
-            # Cleanup temp PDF
-            if os.path.exists(temp_filename):
-                try:
-                    os.remove(temp_filename)
-                    print(f"🗑️ Cleaned up temp file: {temp_filename}")
-                except Exception as cleanup_err:
-                    print(f"Error cleaning up: {cleanup_err}")
+            metrics.PARSES_IN_FLIGHT.dec(len(ingested), endpoint="batch")
+            for writer in writers.values():
+                writer.abort()
+            for _, upload in ingested:
+                upload.cleanup()
+
+    return stream_response(request, batch_generator(), "application/x-ndjson", compression_stats=compression_stats)
+
+def get_job_store():
+    if job_store is None:
+        raise HTTPException(status_code=404, detail="Background jobs are disabled")
+    return job_store
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    bank_name: str = Form(AUTO),
+    password: Optional[str] = Form(None),
+    x_api_key: str = Depends(verify_api_key)
+):
+    """
+    Queue a parse and return at once. Poll GET /jobs/{id} for progress and read
+    the same NDJSON as /parse from GET /jobs/{id}/stream, live or once done.
+    """
+    store = get_job_store()
+    try:
+        upload = await uploads.ingest_upload(file)
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        job_id = await asyncio.to_thread(store.create, upload, file.filename, bank_name, password)
+    except DecryptionFailed as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        upload.cleanup()
+    if job_runner is not None:
+        job_runner.notify()
+    log.info("📥 Queued job %s (%s)", job_id, file.filename, extra={"job_id": job_id})
+    return {
+        "id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "stream_url": f"/jobs/{job_id}/stream",
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, x_api_key: str = Depends(verify_api_key)):
+    store = get_job_store()
+    job = await asyncio.to_thread(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return store.public(job)
 
-    return StreamingResponse(result_generator(), media_type="application/x-ndjson")
+@app.get("/jobs/{job_id}/stream")
+async def stream_job_result(request: Request, job_id: str, x_api_key: str = Depends(verify_api_key)):
+    store = get_job_store()
+    if await asyncio.to_thread(store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return stream_response(request, stream_job(store, job_id), "application/x-ndjson")
 
 if __name__ == "__main__":
     import uvicorn
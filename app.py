@@ -1,9 +1,13 @@
 import streamlit as st
 import main
 import json
-import pdfplumber
-from pdfminer.pdfdocument import PDFPasswordIncorrect
 from config import config
+from document import DocumentSession, PasswordError, probe_encryption
+from bank_registry import available_banks
+from bank_detection import AUTO
+import logs
+
+logs.setup()
 
 # ./venv/bin/streamlit run app.py
 # ./venv/bin/uvicorn api:app --reload
@@ -14,81 +18,108 @@ st.markdown("Upload a PDF file to extract transactions using PDFPlumber (Text-ba
 
 # Sidebar for options
 st.sidebar.header("Configuration")
-bank_options = ["KARNAVATI BANK", "ICICI BANK","HDFC BANK","UNION BANK OF INDIA","KOTAK MAHINDRA BANK","Generic (Raw Text)", ]
+bank_options = available_banks() + [AUTO, "Generic (Raw Text)"]
 selected_bank = st.sidebar.selectbox("Select Bank Format", bank_options)
 
 uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
 
 if uploaded_file is not None:
-    # Check for password protection
+    # Check for password protection: the trailer's /Encrypt entry is enough for
+    # most files. Encrypted ones may still open without a password (empty user
+    # password); those, and files the probe can't read, stay open in `session`
+    # and are reused for extraction below
     password = None
     is_encrypted = False
-    try:
-        uploaded_file.seek(0)
-        with pdfplumber.open(uploaded_file) as pdf:
+    session = None
+    if probe_encryption(uploaded_file) is not False:
+        try:
+            session = DocumentSession(uploaded_file)
             # Accessing pages to trigger decryption check
-            len(pdf.pages)
-    except PDFPasswordIncorrect:
-        is_encrypted = True
-    except Exception as e:
-        if "Password" in str(e) or "Encrypted" in str(e) or "PDFPasswordIncorrect" in repr(e):
+            session.page_count
+        except PasswordError:
             is_encrypted = True
-    
-    uploaded_file.seek(0)
+        except Exception as e:
+            if "Password" in str(e) or "Encrypted" in str(e) or "PDFPasswordIncorrect" in repr(e):
+                is_encrypted = True
 
-    if is_encrypted:
-        st.warning("This PDF is password protected.")
-        password = st.text_input("Enter PDF Password", type="password")
-        if not password:
-            st.stop()
+    # Every Streamlit rerun runs this script again (st.stop() and the button
+    # included): whichever session is open at the end of it is closed
+    try:
+        if is_encrypted:
+            if session is not None:
+                session.close()
+                session = None
+            st.warning("This PDF is password protected.")
+            password = st.text_input("Enter PDF Password", type="password")
+            if not password:
+                st.stop()
 
-    if st.button("Extract Data"):
+        if st.button("Extract Data"):
         
-        with st.spinner(f"Processing PDF..."):
-            try:
-                if selected_bank == "Generic (Raw Text)":
-                    # Raw text dump from plumber
-                    full_text = []
-                    # Pass password here
-                    with pdfplumber.open(uploaded_file, password=password) as pdf:
-                        for i, page in enumerate(pdf.pages):
+            with st.spinner(f"Processing PDF..."):
+                try:
+                    if session is None:
+                        # Pass password here
+                        session = DocumentSession(uploaded_file, password=password)
+
+                    if selected_bank == "Generic (Raw Text)":
+                        # Raw text dump from plumber
+                        full_text = []
+                        for i, page in enumerate(session.pages):
                             text = page.extract_text(layout=True)
                             full_text.append(f"--- Page {i+1} ---\n{text}\n")
                     
-                    final_text = "\n".join(full_text)
+                        final_text = "\n".join(full_text)
                     
-                    st.success("Text Extraction Complete!")
-                    st.subheader("Extracted Text (Layout Preserved)")
-                    st.text_area("Result", final_text, height=400)
+                        st.success("Text Extraction Complete!")
+                        st.subheader("Extracted Text (Layout Preserved)")
+                        st.text_area("Result", final_text, height=400)
                     
-                    st.download_button(
-                        label="Download Result as Text",
-                        data=final_text,
-                        file_name="extracted_text_plumber.txt",
-                        mime="text/plain"
-                    )
-                else:
-                    # Structured Extraction via Plumber
-                    # Pass password here
-                    transactions = main.process_bank_statement_pdf(uploaded_file, bank_name=selected_bank, password=password)
-                    st.success(f"Extraction Complete for {selected_bank}!")
+                        st.download_button(
+                            label="Download Result as Text",
+                            data=final_text,
+                            file_name="extracted_text_plumber.txt",
+                            mime="text/plain"
+                        )
+                    else:
+                        # Structured Extraction via Plumber, reusing the open session
+                        # Compact Transaction records while gathering; dicts only for display
+                        transactions = []
+                        errors = []
+                        parsed_pages = 0
+                        for page_result in main.process_bank_statement_pdf(session, bank_name=selected_bank):
+                            transactions.extend(page_result.transactions)
+                            if page_result.error is not None:
+                                errors.append(page_result)
+                            else:
+                                parsed_pages += 1
+                        rows = [t.to_dict() for t in transactions]
+                        # Page 0 is the document itself (could not be opened, bank not detected)
+                        for page_result in errors:
+                            where = f"Page {page_result.page}" if page_result.page else "Document"
+                            st.error(f"{where}: {page_result.error}")
+                        if parsed_pages:
+                            st.success(f"Extraction Complete for {selected_bank}!")
                     
-                    # Also show as table
-                    if transactions:
-                        st.subheader("Tabular View")
-                        st.dataframe(transactions)
+                        # Also show as table
+                        if rows:
+                            st.subheader("Tabular View")
+                            st.dataframe(rows)
 
-                    # Display as JSON
-                    json_str = json.dumps(transactions, indent=2)
-                    st.subheader("Extracted JSON Data")
-                    st.code(json_str, language="json")
+                        # Display as JSON
+                        json_str = json.dumps(rows, indent=2)
+                        st.subheader("Extracted JSON Data")
+                        st.code(json_str, language="json")
                     
-                    st.download_button(
-                        label="Download Result as JSON",
-                        data=json_str,
-                        file_name="extracted_data.json",
-                        mime="application/json"
-                    )
+                        st.download_button(
+                            label="Download Result as JSON",
+                            data=json_str,
+                            file_name="extracted_data.json",
+                            mime="application/json"
+                        )
                 
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
+    finally:
+        if session is not None:
+            session.close()
@@ -0,0 +1,109 @@
+import re
+from functools import lru_cache
+
+from pdfminer.pdfdevice import PDFDevice
+from pdfminer.pdfinterp import PDFPageInterpreter
+
+import bank_registry
+from document import LazyPages
+
+# bank_name value that asks for detection
+AUTO = "AUTO"
+
+# Characters of page-1 text to read; the header row sits well within this
+TEXT_BUDGET = 1000
+# A layout must match at least this many of its signatures, and beat every other bank
+MIN_SIGNATURE_HITS = 2
+
+
+class _EnoughText(Exception):
+    pass
+
+
+class _TextCollector(PDFDevice):
+    """
+    Decodes shown strings straight from the content stream: no LTChar objects,
+    no layout analysis. Stops as soon as `budget` characters are collected.
+    """
+
+    def __init__(self, rsrcmgr, budget):
+        super().__init__(rsrcmgr)
+        self.parts = []
+        self.remaining = budget
+
+    def render_string(self, textstate, seq, ncs, graphicstate):
+        font = textstate.font
+        if font is None:
+            return
+        out = []
+        for obj in seq:
+            if isinstance(obj, (int, float)):
+                # Large TJ kerning gaps are word breaks
+                if obj < -200:
+                    out.append(" ")
+                continue
+            for cid in font.decode(obj):
+                try:
+                    out.append(font.to_unichr(cid))
+                except Exception:
+                    pass
+        text = "".join(out)
+        self.parts.append(text)
+        self.remaining -= len(text)
+        if self.remaining <= 0:
+            raise _EnoughText
+
+
+def first_page_text(pdf, budget=TEXT_BUDGET):
+    """
+    The first `budget` characters drawn on page 1 of an open pdfplumber PDF,
+    one text-showing operation per line. A few ms, versus a full layout pass.
+    """
+    page = LazyPages(pdf)[0]
+    device = _TextCollector(pdf.rsrcmgr, budget)
+    try:
+        PDFPageInterpreter(pdf.rsrcmgr, device).process_page(page.page_obj)
+    except _EnoughText:
+        pass
+    return "\n".join(device.parts)
+
+
+@lru_cache(maxsize=None)
+def _signature_index():
+    """
+    Every registered bank's signatures, compiled once.
+    """
+    return {
+        bank_name: [re.compile(p, re.MULTILINE) for p in bank_registry.get_signatures(bank_name)]
+        for bank_name in bank_registry.available_banks()
+    }
+
+
+def score_banks(text):
+    return {
+        bank_name: sum(1 for pattern in patterns if pattern.search(text))
+        for bank_name, patterns in _signature_index().items()
+    }
+
+
+def detect_bank(source):
+    """
+    Pick the bank layout from page-1 text (a string or an open pdfplumber PDF /
+    DocumentSession). Returns None when no layout is a clear match.
+    """
+    if hasattr(source, "pdf"):
+        source = source.pdf
+    text = source if isinstance(source, str) else first_page_text(source)
+
+    scores = sorted(score_banks(text).items(), key=lambda item: item[1], reverse=True)
+    if not scores:
+        return None
+    best_bank, best = scores[0]
+    runner_up = scores[1][1] if len(scores) > 1 else 0
+    if best >= MIN_SIGNATURE_HITS and best > runner_up:
+        return best_bank
+    return None
+
+
+def needs_detection(bank_name):
+    return not bank_name or bank_name == AUTO or not bank_registry.is_known_bank(bank_name)
@@ -0,0 +1,142 @@
+import logging
+from functools import lru_cache
+from importlib import import_module
+from importlib.metadata import entry_points
+
+from grouping import PageGrouper
+
+log = logging.getLogger(__name__)
+
+# Third-party parsers register under this group, e.g. in pyproject.toml:
+#   [project.entry-points."bankstatement_parser.banks"]
+#   "SBI BANK" = "sbiBank"
+# The target is a package with table_settings / grouping_logic / structured_output
+# modules (like the built-in ones), a BankParser, or a callable returning one.
+# A package may also define SIGNATURES (regexes) for bank_detection and
+# HEADER_COLUMNS (column header labels) for the word-bucketing engine, and
+# grouping_logic a TransactionGrouper (grouping.Grouper) to group rows across
+# page breaks; without one, every page is grouped on its own.
+ENTRY_POINT_GROUP = "bankstatement_parser.banks"
+
+BUILTIN_BANKS = {
+    "KARNAVATI BANK": "karnavatiBank",
+    "ICICI BANK": "iciciBank",
+    "HDFC BANK": "hdfcBank",
+    "UNION BANK OF INDIA": "unionBank",
+    "KOTAK MAHINDRA BANK": "kotakBank",
+}
+
+
+class UnknownBankError(KeyError):
+    pass
+
+
+class BankParser:
+    """
+    The three pieces that turn a statement page into transactions,
+    plus the page-1 signatures used to detect the layout and, for
+    text-aligned layouts, the header labels the word engine bins by.
+    `grouper` makes the per-document grouping.Grouper; it defaults to
+    grouping each page on its own with group_transactions.
+    """
+
+    __slots__ = ("bank_name", "table_settings", "group_transactions", "generate_structured_output",
+                 "signatures", "header_columns", "grouper")
+
+    def __init__(self, bank_name, table_settings, group_transactions, generate_structured_output,
+                 signatures=(), header_columns=(), grouper=None):
+        self.bank_name = bank_name
+        self.table_settings = table_settings
+        self.group_transactions = group_transactions
+        self.generate_structured_output = generate_structured_output
+        self.signatures = tuple(signatures)
+        self.header_columns = tuple(header_columns)
+        self.grouper = grouper
+
+    def new_grouper(self):
+        """
+        A grouper for one document.
+        """
+        if self.grouper is not None:
+            return self.grouper()
+        return PageGrouper(self.group_transactions)
+
+    @classmethod
+    def from_package(cls, bank_name, package):
+        if isinstance(package, str):
+            package = import_module(package)
+        name = package.__name__
+        grouping_logic = import_module(f"{name}.grouping_logic")
+        return cls(
+            bank_name,
+            import_module(f"{name}.table_settings").table_settings,
+            grouping_logic.group_transactions,
+            import_module(f"{name}.structured_output").generate_structured_output,
+            getattr(package, "SIGNATURES", ()),
+            getattr(package, "HEADER_COLUMNS", ()),
+            getattr(grouping_logic, "TransactionGrouper", None),
+        )
+
+
+@lru_cache(maxsize=None)
+def _sources():
+    """
+    Bank name -> where its parser lives. Nothing is imported here.
+    """
+    sources = dict(BUILTIN_BANKS)
+    try:
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            sources.setdefault(ep.name, ep)
+    except Exception as e:
+        log.error("Error discovering bank parsers: %s", e)
+    return sources
+
+
+def available_banks():
+    return list(_sources())
+
+
+def is_known_bank(bank_name):
+    return bank_name in _sources()
+
+
+@lru_cache(maxsize=None)
+def get_parser(bank_name):
+    """
+    Resolve (and import on first use) the parser for `bank_name`.
+    Raises UnknownBankError instead of guessing; see bank_detection.
+    """
+    sources = _sources()
+    if bank_name not in sources:
+        raise UnknownBankError(bank_name)
+    source = sources[bank_name]
+
+    if isinstance(source, str):
+        return BankParser.from_package(bank_name, source)
+
+    target = source.load()
+    if isinstance(target, BankParser):
+        return target
+    if callable(target):
+        return target()
+    return BankParser.from_package(bank_name, target)
+
+
+@lru_cache(maxsize=None)
+def get_signatures(bank_name):
+    """
+    Detection patterns for `bank_name`. Built-in banks only import their
+    (tiny) package __init__, not the parser modules.
+    """
+    source = _sources()[bank_name]
+    if isinstance(source, str):
+        return tuple(getattr(import_module(source), "SIGNATURES", ()))
+    return get_parser(bank_name).signatures
+
+
+def preload(bank_names=None):
+    """
+    Import parsers ahead of time (worker startup). Defaults to every bank.
+    """
+    for bank_name in bank_names or available_banks():
+        get_parser(bank_name)
@@ -0,0 +1,197 @@
+"""
+End-to-end parse throughput per bank, extraction mode and executor, on
+synthetic statements (benchmarks/synthetic_statements.py).
+
+    python benchmarks/bench_throughput.py [--pages 20] [--banks "HDFC BANK,ICICI BANK"]
+        [--modes tables,template,words] [--executors inline,process] [--repeat 1]
+        [--save results.json] [--compare baseline.json] [--tolerance 0.15]
+
+Extraction modes: "tables" is plain page.extract_tables, "template" the learned
+layout template (PARSE_LAYOUT_TEMPLATE), "words" the word-bucketing engine
+(PARSE_WORD_ENGINE_BANKS, only banks with HEADER_COLUMNS). Every combination
+runs process_bank_statement_pdf in a fresh interpreter, so peak RSS is its own
+and settings reach process-pool workers through the environment.
+
+Reports pages/sec, per-page latency (time between pages reaching the caller)
+percentiles and peak RSS, and checks every transaction came back with the
+date, amount and balance it was generated with. With
+--compare, exits 1 when a combination is more than --tolerance slower than in
+the saved baseline or returned wrong transactions, so it can gate a deploy.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from synthetic_statements import LAYOUTS, build_statement, expected_transactions
+
+MODES = ("tables", "template", "words")
+EXECUTORS = ("inline", "thread", "process")
+
+
+def mode_env(mode, bank_name):
+    env = dict(os.environ)
+    env["PARSE_LAYOUT_TEMPLATE"] = "True" if mode == "template" else "False"
+    env["PARSE_WORD_ENGINE_BANKS"] = bank_name if mode == "words" else ""
+    # Measure extraction, not the cache
+    env["PAGE_CACHE_ENABLED"] = "False"
+    return env
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def first_mismatch(parsed, expected):
+    """
+    The first transaction whose (date, txn_id, remarks, amount_paise,
+    balance_paise) differs from what was generated, as a message; None when all match.
+    """
+    for i, (got, want) in enumerate(zip(parsed, expected)):
+        if tuple(got) != tuple(want):
+            return f"txn {i + 1}: got {tuple(got)}, expected {tuple(want)}"
+    if len(parsed) != len(expected):
+        return f"{len(parsed)}/{len(expected)} txns"
+    return None
+
+
+def run_child(pdf_path, bank_name, executor, repeat):
+    """
+    Runs in the child interpreter: parse `repeat` times, keep the fastest run.
+    Also reports (date, txn_id, remarks, amount_paise, balance_paise) of every transaction.
+    """
+    from main import process_bank_statement_pdf
+
+    best = None
+    rows = None
+    for _ in range(repeat):
+        latencies = []
+        pages = transactions = errors = 0
+        parsed = []
+        start = last = time.perf_counter()
+        # The parser logs every page; keep stdout for the result line
+        with contextlib.redirect_stdout(sys.stderr):
+            for result in process_bank_statement_pdf(pdf_path, bank_name=bank_name, executor=executor):
+                now = time.perf_counter()
+                latencies.append(now - last)
+                last = now
+                pages += 1
+                transactions += len(result.transactions)
+                errors += result.error is not None
+                parsed.extend((t.date, t.txn_id, t.remarks, t.amount_paise, t.balance_paise)
+                              for t in result.transactions)
+        elapsed = time.perf_counter() - start
+        if rows is None:
+            rows = parsed
+        if best is None or elapsed < best["seconds"]:
+            best = {
+                "seconds": elapsed,
+                "pages": pages,
+                "transactions": transactions,
+                "errors": errors,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+            }
+    # Pools are shut down without waiting: reap their workers so they count below
+    for child in multiprocessing.active_children():
+        child.join(timeout=30)
+    # ru_maxrss is in KiB on Linux; RUSAGE_CHILDREN is the largest pool worker
+    best["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    best["worker_rss_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    best["rows"] = rows
+    print(json.dumps(best))
+
+
+def bench(pdf_path, bank_name, mode, executor, repeat):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", pdf_path, bank_name, executor, str(repeat)],
+        env=mode_env(mode, bank_name), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"{bank_name} / {mode} / {executor}: benchmark run failed (exit {proc.returncode})")
+    result = json.loads(lines[-1])
+    result["pages_per_sec"] = result["pages"] / result["seconds"]
+    return result
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Parse throughput per bank, extraction mode and executor.")
+    cli.add_argument("--pages", type=int, default=20)
+    cli.add_argument("--banks", default=",".join(LAYOUTS))
+    cli.add_argument("--modes", default=",".join(MODES))
+    cli.add_argument("--executors", default="inline")
+    cli.add_argument("--repeat", type=int, default=1, help="runs per combination, the fastest is kept")
+    cli.add_argument("--save", help="write the results as JSON")
+    cli.add_argument("--compare", help="JSON saved by an earlier --save to check for regressions")
+    cli.add_argument("--tolerance", type=float, default=0.15, help="allowed pages/sec drop vs --compare")
+    args = cli.parse_args()
+
+    from bank_registry import get_parser
+
+    banks = [b.strip() for b in args.banks.split(",") if b.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    executors = [e.strip() for e in args.executors.split(",") if e.strip()]
+    for name, chosen, known in (("bank", banks, LAYOUTS), ("mode", modes, MODES), ("executor", executors, EXECUTORS)):
+        unknown = [c for c in chosen if c not in known]
+        if unknown:
+            cli.error(f"unknown {name}: {', '.join(unknown)} (expected {', '.join(known)})")
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+
+    results = {}
+    failures = []
+    print(f"{'bank':20} {'mode':8} {'executor':8} {'pages/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          f" {'RSS MB':>7} {'wkr MB':>7}  check")
+    with tempfile.TemporaryDirectory() as tmp:
+        for bank_name in banks:
+            pdf_path = os.path.join(tmp, bank_name.replace(" ", "_") + ".pdf")
+            build_statement(bank_name, args.pages, pdf_path)
+            expected = expected_transactions(bank_name, args.pages)
+            for mode in modes:
+                if mode == "words" and not get_parser(bank_name).header_columns:
+                    continue
+                for executor in executors:
+                    key = f"{bank_name}|{mode}|{executor}"
+                    r = results[key] = bench(pdf_path, bank_name, mode, executor, args.repeat)
+
+                    check = "ok"
+                    mismatch = first_mismatch(r.pop("rows"), expected)
+                    if r["errors"] or mismatch:
+                        check = f"{mismatch or 'all txns match'}, {r['errors']} page errors"
+                        failures.append(f"{key}: {check}")
+                    if key in baseline:
+                        change = r["pages_per_sec"] / baseline[key]["pages_per_sec"] - 1
+                        check += f"  {change:+.0%} vs baseline"
+                        if change < -args.tolerance:
+                            failures.append(f"{key}: {change:+.0%} pages/sec")
+                    print(f"{bank_name:20} {mode:8} {executor:8} {r['pages_per_sec']:8.1f} {r['p50_ms']:8.1f}"
+                          f" {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['rss_mb']:7.0f} {r['worker_rss_mb']:7.0f}  {check}")
+
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if failures:
+        print("\nRegressions:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 6 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+    else:
+        main()
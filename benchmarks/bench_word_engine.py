@@ -0,0 +1,58 @@
+"""
+Word-bucketing engine vs page.extract_tables on a real statement.
+
+    python benchmarks/bench_word_engine.py <pdf_path> ["KOTAK MAHINDRA BANK"] [password]
+
+Char extraction (pdfminer layout) is done before timing, since both engines share it.
+Also checks that both produce the same transactions.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+
+from bank_registry import get_parser
+from word_engine import WordColumnLayout
+
+
+def bench(pdf_path, bank_name="KOTAK MAHINDRA BANK", password=None):
+    parser = get_parser(bank_name)
+    if not parser.header_columns:
+        raise SystemExit(f"{bank_name} declares no HEADER_COLUMNS")
+    engine = WordColumnLayout(parser.header_columns, parser.table_settings)
+
+    tables_time = words_time = 0.0
+    mismatches = []
+    with pdfplumber.open(pdf_path, password=password) as pdf:
+        for page in pdf.pages:
+            page.chars
+
+            start = time.perf_counter()
+            tables = page.extract_tables(parser.table_settings)
+            tables_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            words = engine.extract_tables(page)
+            words_time += time.perf_counter() - start
+
+            expected = parser.generate_structured_output(parser.group_transactions(tables, page.page_number))
+            actual = parser.generate_structured_output(parser.group_transactions(words, page.page_number))
+            if expected != actual:
+                mismatches.append(page.page_number)
+            page.close()
+
+    pages = engine.hits + engine.misses
+    print(f"{bank_name}: {pages} pages ({engine.misses} fell back to extract_tables)")
+    print(f"  extract_tables : {tables_time * 1000 / pages:8.1f} ms/page")
+    print(f"  word engine    : {words_time * 1000 / pages:8.1f} ms/page  ({tables_time / words_time:.1f}x)")
+    print(f"  same transactions: {'yes' if not mismatches else f'NO, pages {mismatches}'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+    else:
+        bench(*sys.argv[1:4])
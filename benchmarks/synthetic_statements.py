@@ -0,0 +1,271 @@
+"""
+Synthetic statement PDFs in each supported bank layout, for benchmarks.
+
+    python benchmarks/synthetic_statements.py <bank_name> <pages> <output.pdf> [password]
+
+Columns, header labels, date / amount formats and table ruling follow what each
+bank's table_settings and group_transactions expect, e.g. ruled grids for ICICI,
+Karnavati and Union, column lines only for HDFC and bare text for Kotak (whose
+transactions also span two lines). Transactions are random but seeded, so the
+same arguments always give the same file.
+"""
+import random
+import sys
+from datetime import date, timedelta
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+PAGE_W, PAGE_H = A4
+MARGIN = 36
+ROW_H = 14
+FONT = "Helvetica"
+FONT_SIZE = 7
+# Space for the table under the title and page number, down to the margin
+TABLE_TOP = PAGE_H - MARGIN - 30
+TABLE_LINES = int((TABLE_TOP - MARGIN) // ROW_H) - 1
+
+NARRATIONS = [
+    "UPI {ref} PAYMENT TO SHIVAMCLINIC",
+    "IMPS {ref} SALARY CREDIT ACME LTD",
+    "NEFT N{ref} RENT TRANSFER",
+    "UPI {ref} GROCERY MART PVT LTD",
+    "RTGS R{ref} VENDOR SETTLEMENT",
+]
+
+
+def _money(paise):
+    rupees, p = divmod(abs(paise), 100)
+    return f"{rupees:,}.{p:02d}"
+
+
+def _transactions(count, seed=7):
+    rng = random.Random(seed)
+    balance = rng.randint(1_000_000, 5_000_000)
+    day = date(2025, 1, 1)
+    txns = []
+    for i in range(count):
+        amount = rng.randint(100, 500_000)
+        debit = rng.random() < 0.6 and balance > amount
+        balance += -amount if debit else amount
+        ref = str(rng.randint(10 ** 11, 10 ** 12 - 1))
+        txns.append({
+            "date": day,
+            "ref": ref,
+            "narration": rng.choice(NARRATIONS).format(ref=ref),
+            "amount": amount,
+            "debit": debit,
+            "balance": balance,
+        })
+        if rng.random() < 0.3:
+            day += timedelta(days=1)
+    return txns
+
+
+# Each layout: columns (header, width), ruling, right-aligned columns, text
+# lines per transaction, the date, txn id and remarks as the parser returns
+# them and the renderer of one transaction's lines
+LAYOUTS = {}
+
+
+def layout(name, columns, ruled_vertical, ruled_horizontal, date_format, txn_id, remarks, right_align=(),
+           lines_per_txn=1):
+    def decorator(fn):
+        LAYOUTS[name] = {
+            "columns": columns,
+            "vertical": ruled_vertical,
+            "horizontal": ruled_horizontal,
+            "date_format": date_format,
+            "txn_id": txn_id,
+            "remarks": remarks,
+            "right_align": set(right_align),
+            "lines_per_txn": lines_per_txn,
+            "render": fn,
+        }
+        return fn
+    return decorator
+
+
+def rows_per_page(bank_name):
+    """
+    Transactions that fit on one page of the bank's layout (at most 40).
+    """
+    return min(40, TABLE_LINES // LAYOUTS[bank_name]["lines_per_txn"])
+
+
+@layout(
+    "HDFC BANK",
+    [("Date", 44), ("Narration", 150), ("Chq./Ref.No.", 70), ("Value Dt", 44),
+     ("Withdrawal Amt.", 60), ("Deposit Amt.", 60), ("Closing Balance", 70)],
+    ruled_vertical=True, ruled_horizontal=False, date_format="%d/%m/%y",
+    txn_id=lambda t: t["ref"], remarks=lambda t: t["narration"][:32].rstrip(), right_align=(4, 5, 6),
+)
+def _hdfc(t, i):
+    return [[
+        t["date"].strftime("%d/%m/%y"),
+        t["narration"][:32],
+        t["ref"],
+        t["date"].strftime("%d/%m/%y"),
+        _money(t["amount"]) if t["debit"] else "",
+        "" if t["debit"] else _money(t["amount"]),
+        _money(t["balance"]),
+    ]]
+
+
+@layout(
+    "KOTAK MAHINDRA BANK",
+    [("#", 18), ("TRANSACTION DATE", 70), ("VALUE DATE", 55), ("TRANSACTION DETAILS", 150),
+     ("CHQ / REF NO.", 80), ("DEBIT/CREDIT(Rs)", 70), ("BALANCE(Rs)", 70)],
+    ruled_vertical=False, ruled_horizontal=False, date_format="%d %b %Y 11:20 AM",
+    txn_id=lambda t: "UPI-" + t["ref"], remarks=lambda t: t["narration"].replace(" ", "/"), right_align=(5, 6),
+    lines_per_txn=2,
+)
+def _kotak(t, i):
+    sign = "-" if t["debit"] else "+"
+    details = t["narration"].replace(" ", "/")
+    return [
+        [str(i + 1), t["date"].strftime("%d %b %Y"), t["date"].strftime("%d-%m-%Y"),
+         details[:28], "UPI-" + t["ref"], sign + _money(t["amount"]), _money(t["balance"])],
+        ["", "11:20 AM", "", details[28:], "", "", ""],
+    ]
+
+
+@layout(
+    "ICICI BANK",
+    [("Sr No", 22), ("Tran Id", 50), ("Value Date", 50), ("Transaction Date", 50),
+     ("Cheque no / Ref No", 55), ("Transaction Remarks", 130), ("Withdrawal (Dr)", 55),
+     ("Deposit (Cr)", 55), ("Balance", 60)],
+    ruled_vertical=True, ruled_horizontal=True, date_format="%d-%b-%Y",
+    txn_id=lambda t: "S" + t["ref"][:8], remarks=lambda t: t["narration"][:26].rstrip(), right_align=(6, 7, 8),
+)
+def _icici(t, i):
+    return [[
+        str(i + 1), "S" + t["ref"][:8], t["date"].strftime("%d-%b-%Y"), t["date"].strftime("%d-%b-%Y"),
+        "NA", t["narration"][:26],
+        _money(t["amount"]) if t["debit"] else "NA",
+        "NA" if t["debit"] else _money(t["amount"]),
+        _money(t["balance"]),
+    ]]
+
+
+@layout(
+    "KARNAVATI BANK",
+    [("Trn Date", 50), ("Value Date", 50), ("Narration", 170), ("Chq/Ref No", 60),
+     ("Withdrawal", 60), ("Deposit", 60), ("Balance", 70)],
+    ruled_vertical=True, ruled_horizontal=True, date_format="%d-%m-%Y",
+    # The ref the parser finds in the narration ("IMPS 1234...", "NEFT N1234...")
+    txn_id=lambda t: t["narration"].split()[1], remarks=lambda t: t["narration"][:36].rstrip(),
+    right_align=(4, 5, 6),
+)
+def _karnavati(t, i):
+    return [[
+        t["date"].strftime("%d-%m-%Y"), t["date"].strftime("%d-%m-%Y"), t["narration"][:36], "",
+        _money(t["amount"]) if t["debit"] else "",
+        "" if t["debit"] else _money(t["amount"]),
+        _money(t["balance"]),
+    ]]
+
+
+@layout(
+    "UNION BANK OF INDIA",
+    [("Date", 55), ("Transaction Id", 70), ("Remarks", 200), ("Amount", 80), ("Balance", 90)],
+    ruled_vertical=True, ruled_horizontal=True, date_format="%d-%m-%Y",
+    txn_id=lambda t: "V" + t["ref"][:8], remarks=lambda t: t["narration"][:40].rstrip(), right_align=(3, 4),
+)
+def _union(t, i):
+    suffix = "(Dr)" if t["debit"] else "(Cr)"
+    return [[
+        t["date"].strftime("%d-%m-%Y"), "V" + t["ref"][:8], t["narration"][:40],
+        f"{t['amount'] / 100:.2f}{suffix}", f"{t['balance'] / 100:.2f}(Cr)",
+    ]]
+
+
+def _draw_page(c, spec, rows, page_num, pages, title):
+    c.setFont(FONT, 10)
+    c.drawString(MARGIN, PAGE_H - MARGIN, title)
+    c.setFont(FONT, FONT_SIZE)
+    c.drawString(MARGIN, PAGE_H - MARGIN - 15, f"Page {page_num} of {pages}")
+
+    widths = [w for _, w in spec["columns"]]
+    xs = [MARGIN]
+    for w in widths:
+        xs.append(xs[-1] + w)
+    top = TABLE_TOP
+    lines = [[h for h, _ in spec["columns"]]] + rows
+    y = top
+    for line in lines:
+        for k, (x, cell) in enumerate(zip(xs, line)):
+            if not cell:
+                continue
+            if k in spec["right_align"]:
+                c.drawRightString(xs[k + 1] - 2, y - ROW_H + 4, cell)
+            else:
+                c.drawString(x + 2, y - ROW_H + 4, cell)
+        y -= ROW_H
+    bottom = y
+    if spec["vertical"]:
+        for x in xs:
+            c.line(x, top, x, bottom)
+    if spec["horizontal"]:
+        for k in range(len(lines) + 1):
+            c.line(xs[0], top - k * ROW_H, xs[-1], top - k * ROW_H)
+    elif spec["vertical"]:
+        c.line(xs[0], top, xs[-1], top)
+        c.line(xs[0], bottom, xs[-1], bottom)
+
+
+def build_statement(bank_name, pages, output, per_page=None, password=None, seed=7, split_last=False):
+    """
+    Write a `pages`-page statement of `bank_name` to `output` (a path or file
+    object), `per_page` transactions a page (default rows_per_page(bank_name)),
+    encrypted when a password is given. Returns the transaction count.
+    With split_last, the wrapped lines of each page's last transaction (in
+    layouts with more than one line per transaction) go to the top of the next
+    page's table, under its banner and header.
+    """
+    spec = LAYOUTS[bank_name]
+    per_page = per_page or rows_per_page(bank_name)
+    txns = _transactions(pages * per_page, seed=seed)
+    encrypt = None
+    if password:
+        from reportlab.lib.pdfencrypt import StandardEncryption
+        encrypt = StandardEncryption(password, canPrint=1)
+    c = canvas.Canvas(output, pagesize=A4, encrypt=encrypt)
+    carry = []
+    for p in range(pages):
+        chunk = txns[p * per_page:(p + 1) * per_page]
+        rows, carry = carry, []
+        for i, t in enumerate(chunk):
+            lines = spec["render"](t, p * per_page + i)
+            if split_last and i == len(chunk) - 1 and p < pages - 1:
+                lines, carry = lines[:1], lines[1:]
+            rows.extend(lines)
+        _draw_page(c, spec, rows, p + 1, pages, f"{bank_name} - Account Statement")
+        c.showPage()
+    c.save()
+    return len(txns)
+
+
+def expected_transactions(bank_name, pages, per_page=None, seed=7):
+    """
+    (date, txn_id, remarks, amount_paise, balance_paise) of every transaction
+    build_statement writes with the same arguments, as the parser should return
+    them: debits negative, the date in the layout's date_format.
+    """
+    spec = LAYOUTS[bank_name]
+    per_page = per_page or rows_per_page(bank_name)
+    return [
+        (t["date"].strftime(spec["date_format"]), spec["txn_id"](t), spec["remarks"](t),
+         -t["amount"] if t["debit"] else t["amount"], t["balance"])
+        for t in _transactions(pages * per_page, seed=seed)
+    ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in LAYOUTS:
+        print(__doc__)
+        print("Banks:", ", ".join(LAYOUTS))
+    else:
+        count = build_statement(sys.argv[1], int(sys.argv[2]), sys.argv[3],
+                                password=(sys.argv[4] if len(sys.argv) > 4 else None))
+        print(f"Wrote {count} transactions to {sys.argv[3]}")
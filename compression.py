@@ -0,0 +1,118 @@
+import logging
+import zlib
+
+import metrics
+import serializer
+from config import config
+
+log = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def available_encodings():
+    """
+    Encodings we can send, most preferred first.
+    """
+    if not config.STREAM_COMPRESSION:
+        return []
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def negotiate(accept_encoding):
+    """
+    The Content-Encoding to use for a request's Accept-Encoding header, or
+    None to send the stream as is. Honours q-values (q=0 refuses an encoding);
+    among encodings the client weights equally, zstd is preferred over gzip.
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Gzip:
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        # Sync flush: everything so far can be decoded now, the window is kept
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class _Zstd:
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+async def compress_stream(chunks, encoding, summary=False):
+    """
+    Compress an async stream of byte chunks as one `encoding` stream. Every
+    chunk is flushed on its own, so the client can decode each page as soon as
+    it arrives. The sizes are logged and counted in the metrics; with `summary`
+    (an opt-in of the request) a final NDJSON record also reports them:
+    {"type": "compression", "encoding", "bytes_in", "bytes_out", "ratio"}
+    (the compressed bytes before that record, and what they decode to).
+    """
+    if encoding == "zstd":
+        compressor = _Zstd(config.STREAM_ZSTD_LEVEL)
+    else:
+        compressor = _Gzip(config.STREAM_GZIP_LEVEL)
+
+    bytes_in = 0
+    bytes_out = 0
+    try:
+        async for chunk in chunks:
+            data = compressor.compress(chunk)
+            bytes_in += len(chunk)
+            bytes_out += len(data)
+            yield data
+    finally:
+        # Also when the client went away mid-stream, so the source cleans up
+        await chunks.aclose()
+
+    ratio = round(bytes_in / bytes_out, 2) if bytes_out else None
+    log.info("🗜️ Sent %s bytes as %s (%s, %sx)", bytes_in, bytes_out, encoding, ratio,
+             extra={"encoding": encoding, "bytes_in": bytes_in, "bytes_out": bytes_out})
+    metrics.STREAM_BYTES.inc(bytes_in, encoding=encoding, stage="raw")
+    metrics.STREAM_BYTES.inc(bytes_out, encoding=encoding, stage="sent")
+    tail = b""
+    if summary:
+        tail = compressor.compress(serializer.line({
+            "type": "compression",
+            "encoding": encoding,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "ratio": ratio,
+        }))
+    yield tail + compressor.finish()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -25,6 +26,78 @@ class Config:
         self.HOST = self._get_val("HOST", "0.0.0.0")
         self.API_KEY = str(self._get_val("API_KEY", "1234567890"))
         self.DEBUG = str(self._get_val("DEBUG", "False")).lower() == "true"
+        # DEBUG adds a line per page; "json" writes one JSON object per log line
+        self.LOG_LEVEL = str(self._get_val("LOG_LEVEL", "INFO")).upper()
+        self.LOG_FORMAT = str(self._get_val("LOG_FORMAT", "text")).lower()
+        # Prometheus /metrics (per-process snapshots merged from RESULTS_DIR/metrics)
+        self.METRICS_ENABLED = str(self._get_val("METRICS_ENABLED", "True")).lower() == "true"
+        self.METRICS_FLUSH_INTERVAL = float(self._get_val("METRICS_FLUSH_INTERVAL", 5.0))
+
+        # Page extraction: "inline", "thread" or "process"
+        self.PARSE_EXECUTOR = str(self._get_val("PARSE_EXECUTOR", "inline")).lower()
+        self.PARSE_MAX_WORKERS = int(self._get_val("PARSE_MAX_WORKERS", os.cpu_count() or 1))
+        # Pages submitted ahead of the one being streamed (0 = 2 x workers)
+        self.PARSE_MAX_IN_FLIGHT = int(self._get_val("PARSE_MAX_IN_FLIGHT", 0))
+        # How the shared process pool starts its workers (spawn is safe under gunicorn threads)
+        self.PARSE_START_METHOD = str(self._get_val("PARSE_START_METHOD", "spawn"))
+        # Comma separated bank names each worker imports at startup (empty = all)
+        self.PARSE_PRELOAD_BANKS = [
+            b.strip() for b in str(self._get_val("PARSE_PRELOAD_BANKS", "")).split(",") if b.strip()
+        ]
+        # Learn ruled table columns on the first page and reuse them on later pages
+        self.PARSE_LAYOUT_TEMPLATE = str(self._get_val("PARSE_LAYOUT_TEMPLATE", "True")).lower() == "true"
+        # Banks extracted with the word-bucketing engine instead of pdfplumber tables
+        # (only banks that declare HEADER_COLUMNS; the rest ignore it). Off by default:
+        # check a bank's statements with benchmarks/bench_word_engine.py first
+        self.PARSE_WORD_ENGINE_BANKS = [
+            b.strip() for b in str(self._get_val("PARSE_WORD_ENGINE_BANKS", "")).split(",")
+            if b.strip()
+        ]
+        # Check the balance chain of pages the template / word engine extracted and
+        # extract a page again with the bank's full table_settings when it breaks
+        self.PARSE_BALANCE_CHECK = str(self._get_val("PARSE_BALANCE_CHECK", "True")).lower() == "true"
+        # Decrypt an encrypted statement once for a parallel parse instead of in every worker
+        self.PARSE_DECRYPT_ONCE = str(self._get_val("PARSE_DECRYPT_ONCE", "True")).lower() == "true"
+        # Low-memory streaming: return freed memory to the OS after every page,
+        # and stop a parse once RSS stays above PARSE_MAX_RSS_MB (0 = no cap)
+        self.PARSE_LOW_MEMORY = str(self._get_val("PARSE_LOW_MEMORY", "False")).lower() == "true"
+        self.PARSE_MAX_RSS_MB = int(self._get_val("PARSE_MAX_RSS_MB", 0))
+
+        # Uploads: dedicated temp dir (e.g. /dev/shm/statement-uploads for tmpfs),
+        # hard size limit and the size below which files are parsed from memory
+        self.UPLOAD_TMP_DIR = str(self._get_val(
+            "UPLOAD_TMP_DIR", os.path.join(tempfile.gettempdir(), "statement-uploads")
+        ))
+        self.UPLOAD_MAX_BYTES = int(self._get_val("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+        self.UPLOAD_MEMORY_THRESHOLD = int(self._get_val("UPLOAD_MEMORY_THRESHOLD", 8 * 1024 * 1024))
+        self.UPLOAD_STALE_SECONDS = int(self._get_val("UPLOAD_STALE_SECONDS", 3600))
+        # /parse/batch: files per request (zip members included) and total request size
+        self.BATCH_MAX_FILES = int(self._get_val("BATCH_MAX_FILES", 50))
+        self.BATCH_MAX_BYTES = int(self._get_val("BATCH_MAX_BYTES", 256 * 1024 * 1024))
+        # CSV / Parquet / Arrow output: rows per Parquet row group / Arrow record batch
+        self.EXPORT_BATCH_ROWS = int(self._get_val("EXPORT_BATCH_ROWS", 1000))
+        # Streamed responses: bytes coalesced per write, and the longest a parsed page waits to go out
+        self.STREAM_CHUNK_BYTES = int(self._get_val("STREAM_CHUNK_BYTES", 64 * 1024))
+        self.STREAM_FLUSH_INTERVAL = float(self._get_val("STREAM_FLUSH_INTERVAL", 0.05))
+        # gzip / zstd (needs zstandard) for clients that send Accept-Encoding
+        self.STREAM_COMPRESSION = str(self._get_val("STREAM_COMPRESSION", "True")).lower() == "true"
+        self.STREAM_GZIP_LEVEL = int(self._get_val("STREAM_GZIP_LEVEL", 6))
+        self.STREAM_ZSTD_LEVEL = int(self._get_val("STREAM_ZSTD_LEVEL", 3))
+        # Background /jobs: parses run per server process, results kept gzipped in RESULTS_DIR/jobs
+        self.JOBS_ENABLED = str(self._get_val("JOBS_ENABLED", "True")).lower() == "true"
+        self.JOBS_CONCURRENCY = int(self._get_val("JOBS_CONCURRENCY", 1))
+        self.JOBS_POLL_INTERVAL = float(self._get_val("JOBS_POLL_INTERVAL", 1.0))
+        self.JOBS_TTL_SECONDS = int(self._get_val("JOBS_TTL_SECONDS", 24 * 3600))
+        # A running job with no progress for this long is requeued (its worker died)
+        self.JOBS_STALE_SECONDS = int(self._get_val("JOBS_STALE_SECONDS", 600))
+
+        # Parse result cache in RESULTS_DIR (keyed on PDF hash + bank + parser version)
+        self.RESULT_CACHE_ENABLED = str(self._get_val("RESULT_CACHE_ENABLED", "True")).lower() == "true"
+        self.RESULT_CACHE_MAX_BYTES = int(self._get_val("RESULT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+        self.RESULT_CACHE_MAX_AGE = int(self._get_val("RESULT_CACHE_MAX_AGE", 7 * 24 * 3600))
+        # Per-page cache keyed on page content fingerprint (same max age)
+        self.PAGE_CACHE_ENABLED = str(self._get_val("PAGE_CACHE_ENABLED", "True")).lower() == "true"
+        self.PAGE_CACHE_MAX_BYTES = int(self._get_val("PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
 
 # Single instance to be used across the app
 config = Config()
@@ -0,0 +1,316 @@
+import io
+import os
+import re
+from multiprocessing import shared_memory
+
+import pdfplumber
+import pypdfium2 as pdfium
+from pdfminer.pdfdocument import PDFPasswordIncorrect
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1
+from pdfplumber.page import Page
+from pdfplumber.utils.exceptions import PdfminerException
+
+
+# Bytes read at the end of the file, and at startxref, to find the trailer
+TRAILER_PROBE_BYTES = 4096
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_XREF_STREAM = re.compile(rb"\s*\d+\s+\d+\s+obj\b")
+# A name ends at whitespace or a delimiter, so /EncryptMetadata is not /Encrypt
+_ENCRYPT = re.compile(rb"/Encrypt(?![^\s/<>\[\]()%{}])")
+_ROOT = re.compile(rb"/Root(?![^\s/<>\[\]()%{}])")
+
+
+class PasswordError(Exception):
+    """
+    An encrypted PDF that can't be opened without a (different) password.
+    """
+
+
+def _password_error(error, source, password):
+    """
+    The PasswordError to raise for `error` from opening `source`, or None when
+    it isn't one: pdfminer rejected the password (pdfplumber wraps that
+    exception, with an empty message) of a file the trailer says is encrypted.
+    """
+    cause = error.args[0] if isinstance(error, PdfminerException) and error.args else error
+    if not isinstance(cause, PDFPasswordIncorrect):
+        return None
+    try:
+        if probe_encryption(source) is False:
+            return None
+    except Exception:
+        pass
+    if password:
+        return PasswordError("Incorrect password for the encrypted PDF")
+    return PasswordError("Password required: the PDF is encrypted")
+
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    position = source.tell()
+    try:
+        return source.seek(0, io.SEEK_END)
+    finally:
+        source.seek(position)
+
+
+def _read_at(source, offset, size):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            fh.seek(offset)
+            return fh.read(size)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[offset:offset + size])
+    position = source.tell()
+    try:
+        source.seek(offset)
+        return source.read(size)
+    finally:
+        source.seek(position)
+
+
+def _trailer_says(trailer):
+    """
+    True / False from a trailer dictionary's text, None if it isn't a full one.
+    """
+    if _ENCRYPT.search(trailer):
+        return True
+    if _ROOT.search(trailer):
+        return False
+    return None
+
+
+def probe_encryption(source):
+    """
+    Whether a PDF (path, bytes or file-like) is encrypted, from the /Encrypt
+    entry of its last trailer alone: the classic trailer in the file's last
+    TRAILER_PROBE_BYTES, else the xref stream dictionary startxref points to.
+    Nothing else is parsed and no key is derived. Returns None when no
+    complete trailer is there (damaged or linearized files); open the
+    document to find out.
+    """
+    size = _source_size(source)
+    tail = _read_at(source, max(0, size - TRAILER_PROBE_BYTES), TRAILER_PROBE_BYTES)
+
+    start = tail.rfind(b"trailer")
+    if start != -1:
+        trailer = tail[start:]
+        end = trailer.find(b"startxref")
+        found = _trailer_says(trailer if end == -1 else trailer[:end])
+        if found is not None:
+            return found
+
+    offsets = _STARTXREF.findall(tail)
+    if offsets:
+        head = _read_at(source, int(offsets[-1]), TRAILER_PROBE_BYTES)
+        if _XREF_STREAM.match(head):
+            end = head.find(b"stream")
+            return _trailer_says(head if end == -1 else head[:end])
+    return None
+
+
+def decrypted_copy(source, password=None):
+    """
+    The PDF (path, bytes or file-like) rewritten without its encryption, as
+    bytes, by PDFium (which pdfplumber already depends on). Whoever opens the
+    copy needs no password, and no key derivation or per-object decryption.
+    """
+    if isinstance(source, io.BytesIO):
+        source = source.getvalue()
+    elif hasattr(source, "read"):
+        source.seek(0)
+        source = source.read()
+    elif isinstance(source, os.PathLike):
+        source = os.fspath(source)
+    document = pdfium.PdfDocument(source, password=password)
+    try:
+        copy = io.BytesIO()
+        document.save(copy, flags=pdfium.raw.FPDF_REMOVE_SECURITY)
+    finally:
+        document.close()
+    return copy.getvalue()
+
+
+class SharedBytes:
+    """
+    Bytes in a named shared-memory block. It pickles as its name, so process
+    workers each read it once instead of receiving the bytes with every page,
+    and nothing is written to disk. The process that created it unlinks it.
+    """
+
+    __slots__ = ("name", "size", "_block")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self._block = None
+
+    @classmethod
+    def create(cls, data):
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        block.buf[:len(data)] = data
+        shared = cls(block.name, len(data))
+        shared._block = block
+        return shared
+
+    def read(self):
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(block.buf[:self.size])
+        finally:
+            block.close()
+
+    def unlink(self):
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def __reduce__(self):
+        return SharedBytes, (self.name, self.size)
+
+
+def count_pages(pdf):
+    """
+    Page count from the page tree root's /Count: one dictionary lookup instead
+    of building every page. Walks the tree when /Count is missing or invalid.
+    """
+    if hasattr(pdf, "_pages"):
+        return len(pdf._pages)
+    try:
+        count = resolve1(resolve1(pdf.doc.catalog["Pages"]).get("Count"))
+        if isinstance(count, int) and count > 0:
+            return count
+    except Exception:
+        pass
+    return sum(1 for _ in PDFPage.create_pages(pdf.doc))
+
+
+def close_pdf(pdf):
+    """
+    pdf.close() would first build every page just to close it; skip that
+    when the pages were only ever accessed through LazyPages.
+    """
+    if hasattr(pdf, "_pages"):
+        pdf.close()
+        return
+    pdf.flush_cache()
+    if not pdf.stream_is_external:
+        pdf.stream.close()
+
+
+class LazyPages:
+    """
+    Drop-in for pdf.pages that walks the page tree only as far as needed and
+    builds each pdfplumber Page when it is asked for. Pages are not kept:
+    the caller closes each one when done with it.
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self._walk = PDFPage.create_pages(pdf.doc)
+        # (pdfminer page, doctop) of every page walked so far
+        self._walked = []
+        self._doctop = 0
+
+    def _walk_to(self, index):
+        while len(self._walked) <= index:
+            try:
+                page_obj = next(self._walk)
+            except StopIteration:
+                return False
+            except Exception as e:
+                raise PdfminerException(e)
+            page_number = len(self._walked) + 1
+            self._walked.append((page_obj, self._doctop))
+            self._doctop += Page(self.pdf, page_obj, page_number, self._doctop).height
+        return True
+
+    def __getitem__(self, index):
+        if index < 0 or not self._walk_to(index):
+            raise IndexError(f"page index {index} out of range")
+        page_obj, doctop = self._walked[index]
+        return Page(self.pdf, page_obj, page_number=index + 1, initial_doctop=doctop)
+
+    def has_page(self, index):
+        """
+        Whether the page tree has a page at `index`, walking it only that far.
+        """
+        return index >= 0 and self._walk_to(index)
+
+    def __iter__(self):
+        index = 0
+        while self._walk_to(index):
+            yield self[index]
+            index += 1
+
+
+class DocumentSession:
+    """
+    A PDF opened (and decrypted) once per request.
+    Pass it to process_bank_statement_pdf instead of a path so the metadata
+    step and page parsing share the same xref, decryption and page tree.
+    """
+
+    def __init__(self, source, password=None):
+        self.source = source
+        self.password = password
+        if hasattr(source, "seek"):
+            source.seek(0)
+        try:
+            self.pdf = pdfplumber.open(source, password=password)
+        except Exception as e:
+            error = _password_error(e, source, password)
+            if error is None:
+                raise
+            raise error from e
+        self._pages = LazyPages(self.pdf)
+        self._page_count = None
+
+    @property
+    def pages(self):
+        return self._pages
+
+    @property
+    def page_count(self):
+        if self._page_count is None:
+            self._page_count = count_pages(self.pdf)
+        return self._page_count
+
+    @property
+    def metadata(self):
+        return self.pdf.metadata
+
+    @property
+    def is_encrypted(self):
+        return self.pdf.doc.encryption is not None
+
+    def trim(self):
+        """
+        Drop pdfminer's parsed-object and font caches. They are rebuilt on
+        demand, so this only trades some speed for memory on long documents.
+        The caches are private to pdfminer: any a version doesn't have is skipped.
+        """
+        if self.pdf is None:
+            return
+        for owner, name in ((self.pdf.doc, "_cached_objs"), (self.pdf.doc, "_parsed_objs"),
+                            (getattr(self.pdf, "rsrcmgr", None), "_cached_fonts")):
+            cache = getattr(owner, name, None)
+            if hasattr(cache, "clear"):
+                cache.clear()
+
+    def close(self):
+        if self.pdf is not None:
+            close_pdf(self.pdf)
+            self.pdf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
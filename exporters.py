@@ -0,0 +1,213 @@
+import csv
+import io
+from decimal import Decimal
+
+import serializer
+from config import config
+
+# output format -> (file extension, media type)
+FORMATS = {
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrows", "application/vnd.apache.arrow.stream"),
+}
+
+# One row per transaction. A page that failed is a single row with only
+# `page` and `error` set, so errors reach the warehouse instead of vanishing.
+COLUMNS = ("page", "date", "date_text", "txn_id", "remarks", "type", "amount", "balance", "error")
+
+
+class ExportUnavailable(ValueError):
+    pass
+
+
+def _rows(result):
+    if result.error is not None:
+        yield (result.page, None, None, None, None, None, None, None, result.error)
+        return
+    for t in result.transactions:
+        yield (result.page, t.posted_on, t.date, t.txn_id, t.remarks, t.type, t.amount_paise, t.balance_paise, None)
+
+
+def _rupees(paise):
+    """
+    "-4970.54" from -497054 paise; "" when the amount couldn't be parsed.
+    """
+    if paise is None:
+        return ""
+    sign = "-" if paise < 0 else ""
+    return f"{sign}{abs(paise) // 100}.{abs(paise) % 100:02d}"
+
+
+class NdjsonExporter:
+    """
+    The /parse page_data lines, one per page.
+    """
+
+    def write_page(self, result):
+        return serializer.page_line(result)
+
+    def close(self):
+        return b""
+
+
+class CsvExporter:
+    """
+    CSV with a header row; every page is emitted as soon as it is parsed.
+    Amounts and balances are plain signed decimals, dates ISO (YYYY-MM-DD).
+    """
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(COLUMNS)
+
+    def write_page(self, result):
+        for page, posted_on, date_text, txn_id, remarks, txn_type, amount, balance, error in _rows(result):
+            self.writer.writerow((
+                page,
+                posted_on.isoformat() if posted_on else "",
+                date_text, txn_id, remarks, txn_type,
+                "" if error else _rupees(amount),
+                "" if error else _rupees(balance),
+                error,
+            ))
+        return self._drain()
+
+    def close(self):
+        return self._drain()
+
+    def _drain(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data.encode("utf-8")
+
+
+class _Drain:
+    """
+    Write-only file for pyarrow writers: keeps what was written until drained,
+    while tell() keeps counting, so a stream can be sent out as it is written.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _ArrowExporter:
+    """
+    Buffers page rows into Arrow record batches of about EXPORT_BATCH_ROWS rows
+    (a Parquet row group / an IPC record batch each), written out as they fill.
+    Amounts and balances are decimal(18, 2), the date a date32.
+    """
+
+    def __init__(self, batch_rows=None):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.batch_rows = config.EXPORT_BATCH_ROWS if batch_rows is None else batch_rows
+        money = pa.decimal128(18, 2)
+        self.schema = pa.schema([
+            ("page", pa.int32()),
+            ("date", pa.date32()),
+            ("date_text", pa.string()),
+            ("txn_id", pa.string()),
+            ("remarks", pa.string()),
+            ("type", pa.string()),
+            ("amount", money),
+            ("balance", money),
+            ("error", pa.string()),
+        ])
+        self.sink = _Drain()
+        self.writer = self._open_writer()
+        self.pending = []
+
+    def write_page(self, result):
+        self.pending.extend(_rows(result))
+        if len(self.pending) >= self.batch_rows:
+            self._flush()
+        return self.sink.drain()
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+        return self.sink.drain()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        columns = list(zip(*self.pending))
+        for i in (6, 7):
+            columns[i] = [None if p is None else Decimal(p).scaleb(-2) for p in columns[i]]
+        batch = self.pa.record_batch(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self._write(batch)
+        self.pending = []
+
+
+class ParquetExporter(_ArrowExporter):
+    def _open_writer(self):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    def _write(self, batch):
+        self.writer.write_batch(batch, row_group_size=len(batch))
+
+
+class ArrowStreamExporter(_ArrowExporter):
+    def _open_writer(self):
+        return self.pa.ipc.new_stream(self.sink, self.schema)
+
+    def _write(self, batch):
+        self.writer.write_batch(batch)
+
+
+def get_exporter(output_format):
+    """
+    A fresh exporter for one statement. Raises ExportUnavailable for an
+    unknown format, or Parquet / Arrow without pyarrow installed.
+    """
+    if output_format not in FORMATS:
+        raise ExportUnavailable(f"Unknown output format '{output_format}', expected one of {tuple(FORMATS)}")
+    if output_format == "ndjson":
+        return NdjsonExporter()
+    if output_format == "csv":
+        return CsvExporter()
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ExportUnavailable(f"{output_format} output needs pyarrow (pip install pyarrow)")
+    return ParquetExporter() if output_format == "parquet" else ArrowStreamExporter()
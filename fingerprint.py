@@ -0,0 +1,78 @@
+import hashlib
+
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from pdfminer.psparser import PSKeyword, PSLiteral
+
+# Streams whose bytes cannot change the extracted text: glyph outlines and image data.
+# Their dictionaries are still hashed, only the (large) payload is skipped.
+SKIPPED_STREAM_KEYS = {"FontFile", "FontFile2", "FontFile3"}
+MAX_DEPTH = 32
+
+
+class _Hasher:
+    """
+    Feeds a PDF object graph into a sha256 in a canonical order.
+    Shared objects (fonts, CMaps) are digested once per document via `memo`.
+    """
+
+    def __init__(self, memo):
+        self.memo = memo
+
+    def digest(self, obj, depth=0, skip_data=False):
+        h = hashlib.sha256()
+        self._feed(h, obj, depth, skip_data)
+        return h.digest()
+
+    def _feed(self, h, obj, depth, skip_data=False):
+        if depth > MAX_DEPTH:
+            h.update(b"<deep>")
+            return
+
+        if isinstance(obj, PDFObjRef):
+            key = (obj.objid, skip_data)
+            if key not in self.memo:
+                # Placeholder first so reference cycles terminate
+                self.memo[key] = b"<cycle:%d>" % obj.objid
+                self.memo[key] = self.digest(obj.resolve(), depth + 1, skip_data)
+            h.update(b"R")
+            h.update(self.memo[key])
+        elif isinstance(obj, PDFStream):
+            h.update(b"S")
+            self._feed(h, obj.attrs, depth + 1)
+            is_image = isinstance(obj.get("Subtype"), PSLiteral) and obj.get("Subtype").name == "Image"
+            if not (skip_data or is_image):
+                h.update(hashlib.sha256(obj.get_data()).digest())
+        elif isinstance(obj, dict):
+            h.update(b"D")
+            for k in sorted(obj, key=str):
+                h.update(str(k).encode("utf-8") + b"=")
+                self._feed(h, obj[k], depth + 1, skip_data or str(k) in SKIPPED_STREAM_KEYS)
+        elif isinstance(obj, (list, tuple)):
+            h.update(b"L%d" % len(obj))
+            for item in obj:
+                self._feed(h, item, depth + 1, skip_data)
+        elif isinstance(obj, (PSLiteral, PSKeyword)):
+            h.update(b"N" + str(obj.name).encode("utf-8"))
+        elif isinstance(obj, bytes):
+            h.update(b"B" + obj)
+        else:
+            h.update(b"V" + repr(obj).encode("utf-8"))
+
+
+def page_fingerprint(page, bank_name, table_settings, parser_version, memo=None):
+    """
+    Hash everything that determines a page's parsed output: its decoded
+    content streams, its resources (fonts, encodings, XObjects), its geometry,
+    and the parser that will read it. Identical pages in different files
+    (e.g. a Jan-Mar and a Jan-Jun statement) get the same fingerprint.
+    Pass the same `memo` dict for every page of a document.
+    """
+    hasher = _Hasher({} if memo is None else memo)
+    page_obj = page.page_obj
+    h = hashlib.sha256()
+    h.update(repr((bank_name, parser_version, sorted(table_settings.items(), key=str))).encode("utf-8"))
+    h.update(repr((page.mediabox, page.rotation)).encode("utf-8"))
+    for stream in page_obj.contents:
+        hasher._feed(h, stream, 0)
+    hasher._feed(h, page_obj.resources, 0)
+    return h.hexdigest()
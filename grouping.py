@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+
+
+def continues(row, columns, banner=None):
+    """
+    Whether `row`, at the top of a page before its first transaction row, is a
+    wrapped line of the transaction left open on the page before: text only in
+    the `columns` that transaction wraps into, and not the page banner
+    (`banner`, a compiled pattern searched in the row's cells run together).
+    """
+    filled = [i for i, cell in enumerate(row) if cell and str(cell).strip()]
+    if not filled or any(i not in columns for i in filled):
+        return False
+    return not (banner is not None and banner.search("".join(str(cell) for cell in row if cell)))
+
+
+def rows_of(tables):
+    """
+    The rows of a page's extracted tables, one after another.
+    """
+    for table in tables:
+        yield from table
+
+
+class Grouper(ABC):
+    """
+    Groups the rows of one document into transactions, in page order.
+    feed() consumes rows (any iterable, pages one after another) and yields each
+    grouped transaction as soon as it closes; close() yields the one still open
+    after the last page. Everything learned from the rows - the header's column
+    mapping, the open transaction - carries over page breaks, so a transaction
+    continued at the top of the next page stays whole.
+    start_page() is called before each page's rows: until the page's first
+    transaction row, groupers only let the open transaction take rows that
+    continues() accepts, so page banners and brought-forward lines stay out.
+    """
+
+    # True from start_page() until the page's first transaction row
+    page_top = False
+
+    def start_page(self):
+        self.page_top = True
+
+    @abstractmethod
+    def feed(self, rows):
+        pass
+
+    def close(self):
+        return iter(())
+
+    def group(self, pages):
+        """
+        Every transaction of `pages` (one page's tables, lists of table rows) as a list.
+        """
+        self.start_page()
+        grouped = list(self.feed(rows_of(pages)))
+        grouped.extend(self.close())
+        return grouped
+
+
+class PageGrouper(Grouper):
+    """
+    A parser that only has group_transactions(pages, page_number): each page
+    is grouped on its own, and nothing carries over.
+    """
+
+    def __init__(self, group_transactions):
+        self.group_transactions = group_transactions
+
+    def feed(self, rows):
+        yield from self.group_transactions([list(rows)], None)
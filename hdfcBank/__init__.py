@@ -0,0 +1,20 @@
+# Header/name patterns used by bank_detection to recognise this layout from page 1
+SIGNATURES = [
+    r"\bHDFC\b",
+    r"\bNarration\b",
+    r"Chq\.?\s*/\s*Ref\.?\s*No",
+    r"\bValue\s+Dt\b",
+    r"Withdrawal\s+Amt",
+    r"Closing\s+Balance",
+]
+
+# Column header labels in order, for the word-bucketing engine (word_engine.py)
+HEADER_COLUMNS = [
+    "Date",
+    "Narration",
+    "Chq./Ref.No.",
+    "Value Dt",
+    "Withdrawal Amt.",
+    "Deposit Amt.",
+    "Closing Balance",
+]
@@ -1,75 +1,76 @@
 import re
-import json
 
-
-def is_footer_or_summary_row(row):
-    text = " ".join(str(c or "").upper() for c in row)
-
-    BLOCK_KEYWORDS = [
-        "STATEMENTSUMMARY",
-        "OPENINGBALANCE",
-        "DRCOUNT",
-        "CRCOUNT",
-        "DEBITS",
-        "CREDITS",
-        "GENERATEDON",
-        "GENERATEDBY",
-        "REQUESTINGBRANCHCODE",
-        "COMPUTERGENERATED",
-        "NOTREQUIRESIGNATURE",
-    ]
-
-    return any(k in text for k in BLOCK_KEYWORDS)
-
-
-DATE_RE = re.compile(r"\d{2}/\d{2}/\d{2}")
+from grouping import Grouper, continues
+from row_classifier import RowClassifier, START, CONTINUATION, SEP, any_of, strip_cells
+
+
+BLOCK_KEYWORDS = [
+    "STATEMENTSUMMARY",
+    "OPENINGBALANCE",
+    "DRCOUNT",
+    "CRCOUNT",
+    "DEBITS",
+    "CREDITS",
+    "GENERATEDON",
+    "GENERATEDBY",
+    "REQUESTINGBRANCHCODE",
+    "COMPUTERGENERATED",
+    "NOTREQUIRESIGNATURE",
+]
+
+DATE_RE = r"\d{2}/\d{2}/\d{2}"
 AMOUNT_RE = re.compile(r"[\d,]+\.\d{2}")
 
-
-def is_date(val):
-    return bool(val and DATE_RE.fullmatch(val.strip()))
-
-
-def is_empty_row(row):
-    return all(not str(c).strip() for c in row)
-
-
-def group_transactions(pages, page_number):
-    transactions = []
-    current = None
-
-    # Fixed column indexes for THIS layout
-    DATE_COL = 0
-    NARR_COL = 1
-    REF_COL = 2
-    VALUE_DT_COL = 3
-    WITHDRAW_COL = 4
-    DEPOSIT_COL = 5
-    BAL_COL = 6
-
-    for page in pages:
-        for row in page:
-
-            # Normalize row length
-            row = [(c or "").strip() for c in row]
-            while len(row) < 7:
-                row.append("")
-
-            # Skip garbage / empty rows
-            if is_empty_row(row):
-                continue
-
-            # Skip header row
-            if row[0] == "Date" and "Narration" in row[1]:
-                continue
+ROWS = RowClassifier(
+    DATE_RE,
+    date_fullmatch=True,
+    normalize=strip_cells,
+    pad_to=7,
+    skip_empty=True,
+    # "Date" | "Narration..." header row
+    header=("text", rf"^Date{SEP}[^{SEP}]*Narration"),
+    # Statement summary / footer text that follows the last transaction
+    footer=("upper", any_of(BLOCK_KEYWORDS)),
+)
+
+
+# Fixed column indexes for THIS layout
+DATE_COL = 0
+NARR_COL = 1
+REF_COL = 2
+VALUE_DT_COL = 3
+WITHDRAW_COL = 4
+DEPOSIT_COL = 5
+BAL_COL = 6
+
+# Columns a transaction's lines wrap into, also onto the next page
+WRAP_COLUMNS = (NARR_COL, REF_COL)
+# Repeated at the top of every page
+BANNER = re.compile(r"Page\s*No\b|Statement\s*of\s*Account|Account\s*Statement", re.IGNORECASE)
+
+
+class TransactionGrouper(Grouper):
+    """
+    HDFC rows into [date, narration, ref, amount, balance] transactions.
+    Narration and ref lines wrapped onto the next page stay with their transaction.
+    """
+
+    def __init__(self):
+        self.current = None
+
+    def feed(self, rows):
+        for row in rows:
+            # Normalized, padded to 7 columns; empty, header and footer rows are classified out
+            kind, row = ROWS.classify(row)
 
             # ---- TRANSACTION START ----
-            if is_date(row[DATE_COL]):
-                # Save previous transaction
-                if current:
-                    transactions.append(current)
+            if kind == START:
+                self.page_top = False
+                # Previous transaction is complete
+                if self.current:
+                    yield self._finish()
 
-                current = {
+                current = self.current = {
                     "date": row[DATE_COL],
                     "narration": [],
                     "ref": [],
@@ -96,35 +97,32 @@ def group_transactions(pages, page_number):
                     current["balance"] = row[BAL_COL]
 
             # ---- CONTINUATION ROW ----
-            elif current:
-                # 🚫 STOP garbage from last page
-                if is_footer_or_summary_row(row):
+            # 🚫 Footer / summary garbage from the last page is never a continuation
+            elif self.current and kind == CONTINUATION:
+                # Above the page's first transaction only its wrapped lines continue it
+                if self.page_top and not continues(row, WRAP_COLUMNS, BANNER):
                     continue
                 if row[NARR_COL]:
-                    current["narration"].append(row[NARR_COL])
+                    self.current["narration"].append(row[NARR_COL])
 
                 if row[REF_COL]:
-                    current["ref"].append(row[REF_COL])
-
-        # end rows
-    # end pages
+                    self.current["ref"].append(row[REF_COL])
 
-    if current:
-        transactions.append(current)
+    def close(self):
+        if self.current:
+            yield self._finish()
 
-    # ---- FINAL NORMALIZATION ----
-    final_rows = []
-    for t in transactions:
-        final_rows.append([
+    def _finish(self):
+        # ---- FINAL NORMALIZATION ----
+        t, self.current = self.current, None
+        return [
             t["date"],
             " ".join(t["narration"]),
             "".join(t["ref"]),
             t["amount"],
             t["balance"]
-        ])
+        ]
 
-    # Optional debug dump
-    # with open(f"page_{page_number}_grouped.json", "w") as f:
-    #     json.dump(final_rows, f, indent=2)
 
-    return final_rows
\ No newline at end of file
+def group_transactions(pages, page_number=None):
+    return TransactionGrouper().group(pages)
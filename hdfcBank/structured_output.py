@@ -1,6 +1,9 @@
+from records import Transaction
+
+
 def generate_structured_output(grouped_transactions):
     """
-    Converts grouped transaction rows into structured JSON objects.
+    Converts grouped transaction rows into records.Transaction objects.
 
     Input row format:
     [
@@ -35,13 +38,8 @@ def generate_structured_output(grouped_transactions):
             txn_type = "CREDIT"
             amount = signed_amount.replace("+", "")
 
-        structured_data.append({
-            "date": txn_date,
-            "txnId": txn_id,
-            "remarks": remarks,
-            "amount": amount,
-            "balance": balance,
-            "type": txn_type
-        })
+        structured_data.append(Transaction(
+            txn_date, txn_id, remarks, amount, balance, txn_type
+        ))
 
     return structured_data
\ No newline at end of file
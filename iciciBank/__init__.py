@@ -0,0 +1,8 @@
+# Header/name patterns used by bank_detection to recognise this layout from page 1
+SIGNATURES = [
+    r"(?i)\bICICI\b",
+    r"\bSr\.?\s*No\b",
+    r"\bTran\.?\s*Id\b",
+    r"Transaction\s+Remarks",
+    r"\b\d{2}-[A-Z][a-z]{2}-\s*\d{4}\b",
+]
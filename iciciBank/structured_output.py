@@ -1,6 +1,9 @@
+from records import Transaction
+
+
 def generate_structured_output(grouped_transactions):
     """
-    Converts ICICI transaction rows into final structured JSON.
+    Converts ICICI transaction rows into records.Transaction objects.
     """
 
     structured_data = []
@@ -32,13 +35,8 @@ def generate_structured_output(grouped_transactions):
             txn_type = "CREDIT"
             amount = deposit
 
-        structured_data.append({
-            "date": txn_date,
-            "txnId": txn_id,
-            "remarks": remarks,
-            "amount": amount,
-            "balance": balance,
-            "type": txn_type
-        })
+        structured_data.append(Transaction(
+            txn_date, txn_id, remarks, amount, balance, txn_type
+        ))
 
     return structured_data
@@ -0,0 +1,462 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+
+import metrics
+import serializer
+from config import config
+from document import decrypted_copy, probe_encryption
+
+log = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+# Seconds between checks of a running job's partial output when tailing it
+TAIL_INTERVAL = 0.25
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    bank_name TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    page_count INTEGER NOT NULL DEFAULT 0,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    updated REAL NOT NULL,
+    finished REAL
+)
+"""
+
+# Columns reported by GET /jobs/{id}
+PUBLIC_FIELDS = ("id", "status", "filename", "bank_name", "page_count", "pages_done", "error",
+                 "created", "started", "finished")
+
+
+class DecryptionFailed(Exception):
+    pass
+
+
+class JobStore:
+    """
+    Parse jobs in a SQLite database under RESULTS_DIR/jobs, next to their files:
+      {id}.pdf           the uploaded statement, until the job finishes
+      {id}.ndjson.part   NDJSON written so far, while the job runs
+      {id}.ndjson.gz     the finished result, kept for `ttl` seconds
+    Every server process shares the same queue, so any of them can run a job
+    and report or stream any other's. Passwords are never stored: an encrypted
+    upload is queued as its decrypted copy.
+    claim() hands the runner an `owner` token; progress, heartbeat and finish
+    only write while that token still holds the job, so a runner whose job was
+    taken over as stale can't publish over the new one.
+    """
+
+    def __init__(self, directory, ttl=None, stale_after=None):
+        self.directory = directory
+        self.ttl = config.JOBS_TTL_SECONDS if ttl is None else ttl
+        self.stale_after = config.JOBS_STALE_SECONDS if stale_after is None else stale_after
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, "jobs.db")
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                # Databases created before claim tokens
+                db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def path(self, job_id, kind):
+        suffix = {"input": ".pdf", "part": ".ndjson.part", "result": ".ndjson.gz"}[kind]
+        return os.path.join(self.directory, job_id + suffix)
+
+    def create(self, upload, filename, bank_name, password=None):
+        """
+        Queue a parse of `upload` (an uploads.IngestedUpload); the PDF is moved
+        or copied next to the database so the job survives the request.
+        With a password, an encrypted PDF is decrypted here, once, and only the
+        copy is kept; raises DecryptionFailed if it can't be.
+        """
+        data = None
+        if password and probe_encryption(upload.source) is not False:
+            try:
+                data = decrypted_copy(upload.source, password)
+            except Exception as e:
+                raise DecryptionFailed(f"Could not decrypt the PDF: {e}") from e
+
+        job_id = uuid.uuid4().hex
+        input_path = self.path(job_id, "input")
+        if data is not None:
+            with open(input_path, "wb") as fh:
+                fh.write(data)
+            sha256, size = hashlib.sha256(data).hexdigest(), len(data)
+        elif upload.path:
+            shutil.move(upload.path, input_path)
+            upload.path = None
+            sha256, size = upload.sha256, upload.size
+        else:
+            with open(input_path, "wb") as fh:
+                fh.write(upload.source.getvalue())
+            sha256, size = upload.sha256, upload.size
+
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, status, filename, bank_name, sha256, size, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, filename, bank_name, sha256, size, now, now),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def public(self, job):
+        return {field: job[field] for field in PUBLIC_FIELDS}
+
+    def claim(self):
+        """
+        Atomically take the oldest queued job (or one whose runner stopped
+        reporting progress, e.g. a killed worker) and mark it running under a
+        new owner token, returned as job["owner"]. A taken over job keeps its
+        progress; see open_part.
+        """
+        now = time.time()
+        owner = uuid.uuid4().hex
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = ? OR (status = ? AND updated < ?)"
+                " ORDER BY created LIMIT 1",
+                (QUEUED, RUNNING, now - self.stale_after),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, started = ?, updated = ? WHERE id = ?",
+                (RUNNING, owner, now, now, row["id"]),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+        job = dict(row)
+        job["status"] = RUNNING
+        job["owner"] = owner
+        return job
+
+    def progress(self, job_id, owner, pages_done, page_count=None):
+        """
+        Record pages done. False when `owner` no longer holds the job.
+        """
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET pages_done = ?, page_count = COALESCE(?, page_count), updated = ?"
+                " WHERE id = ? AND owner = ? AND status = ?",
+                (pages_done, page_count, time.time(), job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id, owner):
+        """
+        Keep a running job from turning stale while a slow page is parsed.
+        False when `owner` no longer holds the job.
+        """
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET updated = ? WHERE id = ? AND owner = ? AND status = ?",
+                (time.time(), job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id, owner, status, error=None):
+        """
+        Publish the result: compress the partial NDJSON into the result file,
+        then mark the job finished and drop its input. Nothing is published,
+        and False returned, when `owner` no longer holds the job.
+        """
+        part_path = self.path(job_id, "part")
+        result_path = self.path(job_id, "result")
+        tmp_path = f"{result_path}.{uuid.uuid4().hex}.tmp"
+        if os.path.exists(part_path):
+            with open(part_path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+
+        now = time.time()
+        db = self._connect()
+        try:
+            # The ownership check, the result file and the status change happen together
+            db.execute("BEGIN IMMEDIATE")
+            cursor = db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ?, finished = ?"
+                " WHERE id = ? AND owner = ? AND status = ?",
+                (status, error, now, now, job_id, owner, RUNNING),
+            )
+            owned = cursor.rowcount == 1
+            if owned and os.path.exists(tmp_path):
+                os.replace(tmp_path, result_path)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+            self._remove(tmp_path)
+        if owned:
+            for path in (part_path, self.path(job_id, "input")):
+                self._remove(path)
+        return owned
+
+    def sweep(self):
+        """
+        Delete finished jobs older than the TTL, with their files.
+        """
+        cutoff = time.time() - self.ttl
+        with self._connect() as db:
+            expired = [
+                row["id"] for row in db.execute(
+                    "SELECT id FROM jobs WHERE finished IS NOT NULL AND finished < ?", (cutoff,)
+                )
+            ]
+            for job_id in expired:
+                db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        for job_id in expired:
+            for kind in ("input", "part", "result"):
+                self._remove(self.path(job_id, kind))
+        if expired:
+            log.info("🗑️ Removed %s expired job(s)", len(expired))
+        return len(expired)
+
+    def open_part(self, job_id):
+        """
+        Open the job's partial NDJSON for appending. A job taken over from a
+        runner that stopped keeps what was written, cut back to the last
+        complete line, so streams already tailing it stay valid.
+        Returns (file, number of complete lines already in it).
+        """
+        path = self.path(job_id, "part")
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            data = b""
+        end = data.rfind(b"\n") + 1
+        part = open(path, "ab")
+        if end < len(data):
+            part.truncate(end)
+        return part, data.count(b"\n")
+
+    def read_part(self, job_id, offset):
+        """
+        Complete NDJSON lines appended since byte `offset`: (lines, new offset).
+        """
+        try:
+            with open(self.path(job_id, "part"), "rb") as fh:
+                fh.seek(offset)
+                data = fh.read()
+        except OSError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        return data[:end].splitlines(keepends=True), offset + end
+
+    def read_result(self, job_id):
+        try:
+            with gzip.open(self.path(job_id, "result"), "rb") as fh:
+                return fh.readlines()
+        except (OSError, EOFError):
+            return []
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def stream_job(store, job_id):
+    """
+    NDJSON of a job: the stored result once it has finished, otherwise the
+    lines written so far followed by new ones as the parse produces them.
+    """
+    sent = 0
+    offset = 0
+    while True:
+        job = await asyncio.to_thread(store.get, job_id)
+        if job is None:
+            return
+        if job["status"] in FINISHED:
+            lines = await asyncio.to_thread(store.read_result, job_id)
+            for line in lines[sent:]:
+                yield line
+            return
+        lines, offset = await asyncio.to_thread(store.read_part, job_id, offset)
+        for line in lines:
+            yield line
+        sent += len(lines)
+        if not lines:
+            await asyncio.sleep(TAIL_INTERVAL)
+
+
+class JobRunner:
+    """
+    Runs queued jobs in this server process, `concurrency` at a time.
+    `parse(upload, filename, bank_name, password)` is the async generator of
+    NDJSON lines used by /parse, so a job produces exactly the same output.
+    A job taken over from another runner is parsed again from the start, and
+    the lines its part file already holds are skipped. While a job runs, a
+    heartbeat keeps it from looking stale every `heartbeat_interval` seconds
+    (a quarter of the store's stale_after by default); a runner that lost its
+    job anyway stops without writing to it again.
+    """
+
+    def __init__(self, store, parse, concurrency=None, poll_interval=None, heartbeat_interval=None):
+        self.store = store
+        self.parse = parse
+        self.concurrency = config.JOBS_CONCURRENCY if concurrency is None else concurrency
+        self.poll_interval = config.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.heartbeat_interval = store.stale_after / 4 if heartbeat_interval is None else heartbeat_interval
+        self.tasks = []
+        self.wakeup = asyncio.Event()
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def notify(self):
+        """
+        A job was just queued by this process: don't wait for the next poll.
+        """
+        self.wakeup.set()
+
+    async def _loop(self):
+        last_sweep = 0
+        while True:
+            try:
+                if time.time() - last_sweep > self.poll_interval * 60:
+                    await asyncio.to_thread(self.store.sweep)
+                    last_sweep = time.time()
+                job = await asyncio.to_thread(self.store.claim)
+                if job is not None:
+                    await self._run(job)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("❌ Job runner error: %s", e)
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, job_id, owner, lost):
+        while not lost.is_set():
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await asyncio.to_thread(self.store.heartbeat, job_id, owner):
+                lost.set()
+
+    async def _run(self, job):
+        from uploads import IngestedUpload
+
+        job_id = job["id"]
+        owner = job["owner"]
+        log.info("🧾 Running job %s (%s)", job_id, job["filename"], extra={"job_id": job_id})
+        input_path = self.store.path(job_id, "input")
+        upload = IngestedUpload(input_path, job["size"], sha256=job["sha256"])
+        pages_done = 0
+        page_errors = 0
+        error = None
+        part, written = await asyncio.to_thread(self.store.open_part, job_id)
+        if written:
+            log.info("🧾 Resuming job %s after %s line(s)", job_id, written, extra={"job_id": job_id})
+        lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, owner, lost))
+        metrics.PARSES_IN_FLIGHT.inc(endpoint="jobs")
+        try:
+            async for line in self.parse(upload, job["filename"], job["bank_name"], None):
+                data = line.encode("utf-8") if isinstance(line, str) else line
+                record = serializer.loads(data)
+                if record.get("type") == "metadata":
+                    page_count = record["documentmetadata"]["page_count"]
+                    owned = await asyncio.to_thread(self.store.progress, job_id, owner, 0, page_count)
+                elif record.get("type") == "error":
+                    error = record.get("message")
+                    owned = await asyncio.to_thread(self.store.heartbeat, job_id, owner)
+                else:
+                    pages_done += 1
+                    if record.get("error"):
+                        page_errors += 1
+                    owned = await asyncio.to_thread(self.store.progress, job_id, owner, pages_done)
+                if not owned or lost.is_set():
+                    lost.set()
+                    break
+
+                if written:
+                    written -= 1
+                else:
+                    await asyncio.to_thread(_append, part, data)
+        except asyncio.CancelledError:
+            # Server shutting down: leave it running, it is picked up again once stale
+            part.close()
+            raise
+        except Exception as e:
+            error = str(e)
+            if await asyncio.to_thread(self.store.heartbeat, job_id, owner):
+                await asyncio.to_thread(_append, part, serializer.line({"type": "error", "message": error}))
+            else:
+                lost.set()
+        finally:
+            metrics.PARSES_IN_FLIGHT.dec(endpoint="jobs")
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        part.close()
+        if lost.is_set():
+            log.warning("⚠️ Job %s was taken over by another runner", job_id, extra={"job_id": job_id})
+            return
+
+        # Failed when the parse stopped early or no page parsed; otherwise done,
+        # with page errors counted in `error` (details are in the stream)
+        status = FAILED if error is not None or pages_done == page_errors else DONE
+        if error is None and page_errors:
+            error = f"{page_errors} page(s) reported errors"
+        if not await asyncio.to_thread(self.store.finish, job_id, owner, status, error):
+            log.warning("⚠️ Job %s was taken over by another runner", job_id, extra={"job_id": job_id})
+            return
+        log.info("%s Job %s %s", "✅" if status == DONE else "❌", job_id, status, extra={"job_id": job_id})
+
+
+def _append(fh, data):
+    fh.write(data)
+    # Visible to /jobs/{id}/stream in other processes right away
+    fh.flush()
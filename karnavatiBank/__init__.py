@@ -0,0 +1,9 @@
+# Header/name patterns used by bank_detection to recognise this layout from page 1
+SIGNATURES = [
+    r"(?i)\bKarnavati\b",
+    r"(?i)\bTrn\.?\s*Date\b",
+    r"\bNarration\b",
+    r"Chq\s*/\s*Ref",
+    r"\bWithdrawal\b",
+    r"\bDeposit\b",
+]
@@ -1,20 +1,16 @@
-import re
+from row_classifier import RowClassifier, START, collapse_cells
 
 
-DATE_RE = re.compile(r"\d{2}-\d{2}-\d{4}")
-
-
-def normalize_cell(val):
+ROWS = RowClassifier(
+    r"\d{2}-\d{2}-\d{4}",
+    date_fullmatch=True,
     # Convert multiline text to single line
-    return " ".join(str(val or "").split())
-
-
-def is_date(val):
-    return bool(val and DATE_RE.fullmatch(val))
-
-
-def is_empty_row(row):
-    return all(not c for c in row)
+    normalize=collapse_cells,
+    # Expected columns = 7
+    min_cells=7,
+    skip_empty=True,
+    header=("upper", r"^TRN"),
+)
 
 
 def group_transactions(pages, page_number=None):
@@ -22,22 +18,11 @@ def group_transactions(pages, page_number=None):
 
     for page in pages:
         for row in page:
-            # Normalize row cells
-            row = [normalize_cell(c) for c in row]
-
-            # Expected columns = 7
-            if len(row) < 7:
-                continue
-
-            if is_empty_row(row):
-                continue
-
-            # Skip header
-            if row[0].upper().startswith("TRN"):
-                continue
+            # Normalized row; short, empty and header rows never classify as START
+            kind, row = ROWS.classify(row)
 
             # Validate transaction date
-            if not is_date(row[0]):
+            if kind != START:
                 continue
 
             grouped.append(row)
@@ -1,23 +1,20 @@
-import re
+from records import Transaction
+from row_classifier import first_group, first_of
+
+# Reference number patterns, in priority order (first that matches anywhere wins)
+TXN_REF_RE = first_of([
+    r"IMPS\s+(\d+)",
+    r"NEFT\s+([A-Z0-9]+)",
+    r"RTGS\s+([A-Z0-9]+)",
+    r"UPI\s+(\d+)",
+])
 
 
 def extract_txn_ref(narration):
     if not narration:
         return None
 
-    patterns = [
-        r"IMPS\s+(\d+)",
-        r"NEFT\s+([A-Z0-9]+)",
-        r"RTGS\s+([A-Z0-9]+)",
-        r"UPI\s+(\d+)",
-    ]
-
-    for pat in patterns:
-        m = re.search(pat, narration)
-        if m:
-            return m.group(1)
-
-    return None
+    return first_group(TXN_REF_RE, narration)
 
 
 def generate_structured_output(grouped_transactions):
@@ -60,13 +57,8 @@ def generate_structured_output(grouped_transactions):
         if narration.strip().upper() in ["OPENING BALANCE", "CLOSING BALANCE"]:
             continue
 
-        structured_data.append({
-            "date": txn_date,
-            "txnId": txn_id,
-            "remarks": narration,
-            "amount": amount,
-            "balance": balance,
-            "type": txn_type
-        })
+        structured_data.append(Transaction(
+            txn_date, txn_id, narration, amount, balance, txn_type
+        ))
 
     return structured_data
@@ -0,0 +1,19 @@
+# Header/name patterns used by bank_detection to recognise this layout from page 1
+SIGNATURES = [
+    r"(?i)\bKotak\b",
+    r"TRANSACTION\s+DATE",
+    r"TRANSACTION\s+DETAILS",
+    r"CHQ\s*/\s*REF\s+NO",
+    r"DEBIT\s*/\s*CREDIT",
+]
+
+# Column header labels in order, for the word-bucketing engine (word_engine.py)
+HEADER_COLUMNS = [
+    "#",
+    "TRANSACTION DATE",
+    "VALUE DATE",
+    "TRANSACTION DETAILS",
+    "CHQ / REF NO.",
+    "DEBIT/CREDIT",
+    "BALANCE",
+]
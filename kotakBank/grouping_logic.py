@@ -1,193 +1,155 @@
-import json
 import re
 
-def is_date(text):
-    return bool(
-        text and re.search(r'\d{2}\s+[A-Z][a-z]{2}\s+\d{4}', text)
-    )
-
-def is_time(text):
-    return bool(
-        text and re.search(r'\d{1,2}:\d{2}\s*(AM|PM)', text)
-    )
-
-def normalize(items):
-    return ''.join(
-        sorted(
-            ''.join(sorted(str(v).strip()))
-            for v in items
-            if str(v).strip()
-        )
-    )
-
-def is_transaction_start(row,tarnsectionDateIndex):
-    """
-    Transaction starts ONLY when a DATE is found in row[1].
-    """
-    if len(row) < 2:
-        return False
+from grouping import Grouper, continues
+from row_classifier import RowClassifier, HEADER, START, CONTINUATION, SEP, any_of
 
-    col1 = str(row[tarnsectionDateIndex]).strip()
+ROWS = RowClassifier(
+    r'\d{2}\s+[A-Z][a-z]{2}\s+\d{4}',
+    # Column header row: first cell "#" or any cell "TRANSACTION DATE"
+    # (literals first so the regex engine can scan for them quickly)
+    header=("upper", rf"(?:#(?<!.#)|TRANSACTION DATE(?<![^{SEP}]TRANSACTION DATE))(?![^{SEP}])"),
+    # Page footer text ("Statement ...", "...ment generated on") is not a continuation
+    footer=("text", any_of(["tate", "ment generated on"])),
+)
 
-    return is_date(col1)
+# Repeated at the top of every page
+BANNER = re.compile(r"KOTAK\s*MAHINDRA\s*BANK|Account\s*Statement|Page\s*\d+\s*of\s*\d+", re.IGNORECASE)
 
 
-def group_transactions(pages,page_number):
+class TransactionGrouper(Grouper):
     """
-    Groups raw table rows into grouped transaction blocks.
-    Args:
-        pages (list): A list of pages, where each page is a list of rows, and each row is a list of cell strings.
-    Returns:
-        list: A list of transactions, where each transaction is a list of rows that belong to it.
+    Kotak rows into [date, details, ref, amount, balance] transactions.
+    A transaction is every row from one with a date in the transaction date
+    column up to the next; the columns come from the latest header row, which
+    later pages without one keep using.
     """
-    transactions = []
-    current_transaction = []
-    
-    # Flag to indicate if we have started processing actual transactions (to skip pre-header garbage)
-    in_transactions = False
-    hashIndex=0
-    tarnsectionDateIndex=0
-    valuedateIndex=0
-    transactionDetailsIndex=0
-    chqRefNoIndex=0
-    debitCreditIndex=0
-    balanceIndex=0
-
-    for page in pages:
-        for row in page:
+
+    def __init__(self):
+        self.hashIndex = 0
+        self.tarnsectionDateIndex = 0
+        self.valuedateIndex = 0
+        self.transactionDetailsIndex = 0
+        self.chqRefNoIndex = 0
+        self.debitCreditIndex = 0
+        self.balanceIndex = 0
+        # Open transaction: its date / details / ref / amount / balance parts
+        self.current = None
+
+    def feed(self, rows):
+        for row in rows:
             if not row:
                 continue
-            
-            first_col = str(row[0]).strip()
-            
-            # # Heuristic: Skip Header Rows
-            # # Header typically starts with '#' or contains 'TRANSACTION DATE'
-            # expected = ['#', 'TRANSACTION DATE', 'VALUE', 'DATE', 'TRANSACTION DETAILS', 'CHQ / REF NO.', 'DEBIT/CREDIT(₹)', 'BALANCE(₹)']
-            # # Create sorted strings for comparison
-            # row_normalized = normalize(row)
-            # expected_normalized = normalize(expected)
-            # # Check if sorted strings match
-            
-            if first_col == "#" or "TRANSACTION DATE" in [str(c).upper().strip() for c in row]:
-                for idx, val in enumerate(row):
-                    
-                    if str(val).strip() == "#":
-                        hashIndex=idx
-                    elif "TRANSACTION DATE" in str(val).upper().strip():
-                        tarnsectionDateIndex=idx
-                    elif "VALUE" in str(val).upper().strip():
-                        valuedateIndex=idx
-                    elif "DETAILS" in str(val).upper().strip():
-                        transactionDetailsIndex=idx
-                    elif "CHQ / REF NO." in str(val).upper().strip():
-                        chqRefNoIndex=idx
-                    elif "DEBIT/CREDIT" in str(val).upper().strip():
-                        debitCreditIndex=idx
-                    elif "BALANCE" in str(val).upper().strip():
-                        balanceIndex=idx
+
+            kind, row = ROWS.classify(row, self.tarnsectionDateIndex)
+
+            if kind == HEADER:
+                self._read_header(row)
                 continue
-            
-            # Heuristic: New Transaction starts with a date in the first column
-            if is_transaction_start(row,tarnsectionDateIndex):
-                # If we were building a transaction, save it
-                if current_transaction:
-                    transactions.append(current_transaction)
-                
-                # Start new transaction
-                current_transaction = [row]
-                in_transactions = True
-                copyright
-            elif in_transactions:
-                # If we are inside a transaction handling sequence, subsequent rows 
-                # with empty first column are likely continuation rows.
-                # Verification: Most extracted tables have empty first col for wrapped text lines.
-                
-                # We append blindly if first_col is empty. 
-                # If there's a row with text in first_col but not a number (e.g. garbage?), 
-                # we might need to handle it, but for now assuming strict table structure.
-                if not any("tate" in str(cell) or "ment generated on" in str(cell) for cell in row):
-                    current_transaction.append(row)
-                else:
-                    # If first_col is not empty and not a number, what is it?
-                    # Could be footer or page number text mistakenly in the column?
-                    # For safety, if it looks like garbage, we might ignore or append.
-                    # Given the user example, let's treat it as continuation if it doesn't look like a start.
-                    pass
-            
-    # Append the final transaction if exists
-    if current_transaction:
-        transactions.append(current_transaction)
-    # with open(f"page_{page_number}_raw2.json", "w") as f:
-    #         json.dump(transactions, f, indent=4)
-    # Validation and Processing to merge rows
-    merged_transactions = []
-    
-    for txn_rows in transactions:
-        if not txn_rows:
-            continue
-            
-        # Initialize fields
-        merged_date = []
-        merged_desc = []
-        merged_ref = []
-        merged_amt = []
-        merged_bal = []
-        
-        for row in txn_rows:
-            # Ensure row has enough columns (pad if necessary, though usually extract_tables does it)
-            # We need up to index 8
-            while len(row) < 9:
-                row.append("")
-            # Date (Col 1)
-            if row[tarnsectionDateIndex] and str(row[tarnsectionDateIndex]).strip():
-                merged_date.append(str(row[tarnsectionDateIndex]).strip())
-            # Description (Col 4 + Col 5)
-            # User wants: array[0][4]+array[0][5] + array[1][4]+array[1][5] ...
-            part1 = str(row[transactionDetailsIndex]).strip() if row[transactionDetailsIndex] else ""
-            if transactionDetailsIndex + 1 != chqRefNoIndex:
-                part2 = str(row[transactionDetailsIndex + 1]).strip() if len(row) > transactionDetailsIndex + 1 and row[transactionDetailsIndex + 1] else ""
-            else:
-                part2 = ""
-            if part1 or part2:
-                merged_desc.append(part1 + part2)
-                
-            # Ref (Col 6)
-            if row[chqRefNoIndex] and str(row[chqRefNoIndex]).strip():
-                merged_ref.append(str(row[chqRefNoIndex]).strip())
-                
-            # Amount (Col 7)
-            if row[debitCreditIndex] and str(row[debitCreditIndex]).strip():
-                merged_amt.append(str(row[debitCreditIndex]).strip())
-                
-            # Balance (Col 8)
-            if row[balanceIndex] and str(row[balanceIndex]).strip():
-                merged_bal.append(str(row[balanceIndex]).strip())
-        
+
+            # Heuristic: New Transaction starts with a date in the transaction date column
+            if kind == START:
+                self.page_top = False
+                # If we were building a transaction, it is complete now
+                if self.current is not None:
+                    yield self._finish()
+                self.current = ([], [], [], [], [])
+                self._add(row)
+            elif self.current is not None and kind == CONTINUATION:
+                # Wrapped text lines of the open transaction, also at the top of
+                # the next page (only those, see continues()). Footer text
+                # (FOOTER) is skipped.
+                if self.page_top and not continues(row, self._wrap_columns(), BANNER):
+                    continue
+                self._add(row)
+
+    def close(self):
+        if self.current is not None:
+            yield self._finish()
+
+    def _read_header(self, row):
+        for idx, val in enumerate(row):
+            val = str(val).upper().strip()
+            if val == "#":
+                self.hashIndex = idx
+            elif "TRANSACTION DATE" in val:
+                self.tarnsectionDateIndex = idx
+            elif "VALUE" in val:
+                self.valuedateIndex = idx
+            elif "DETAILS" in val:
+                self.transactionDetailsIndex = idx
+            elif "CHQ / REF NO." in val:
+                self.chqRefNoIndex = idx
+            elif "DEBIT/CREDIT" in val:
+                self.debitCreditIndex = idx
+            elif "BALANCE" in val:
+                self.balanceIndex = idx
+
+    def _wrap_columns(self):
+        """
+        Columns a transaction's later lines use: the time under the date, the
+        details (and the cell after them) and the ref.
+        """
+        details = self.transactionDetailsIndex
+        columns = {self.tarnsectionDateIndex, details, self.chqRefNoIndex}
+        if details + 1 != self.chqRefNoIndex:
+            columns.add(details + 1)
+        return columns
+
+    def _add(self, row):
+        merged_date, merged_desc, merged_ref, merged_amt, merged_bal = self.current
+        # Ensure row has enough columns (pad if necessary, though usually extract_tables does it)
+        # We need up to index 8
+        while len(row) < 9:
+            row.append("")
+        # Date (Col 1)
+        if row[self.tarnsectionDateIndex] and str(row[self.tarnsectionDateIndex]).strip():
+            merged_date.append(str(row[self.tarnsectionDateIndex]).strip())
+        # Description (Col 4 + Col 5)
+        # User wants: array[0][4]+array[0][5] + array[1][4]+array[1][5] ...
+        details = self.transactionDetailsIndex
+        part1 = str(row[details]).strip() if row[details] else ""
+        if details + 1 != self.chqRefNoIndex:
+            part2 = str(row[details + 1]).strip() if len(row) > details + 1 and row[details + 1] else ""
+        else:
+            part2 = ""
+        if part1 or part2:
+            merged_desc.append(part1 + part2)
+
+        # Ref (Col 6)
+        if row[self.chqRefNoIndex] and str(row[self.chqRefNoIndex]).strip():
+            merged_ref.append(str(row[self.chqRefNoIndex]).strip())
+
+        # Amount (Col 7)
+        if row[self.debitCreditIndex] and str(row[self.debitCreditIndex]).strip():
+            merged_amt.append(str(row[self.debitCreditIndex]).strip())
+
+        # Balance (Col 8)
+        if row[self.balanceIndex] and str(row[self.balanceIndex]).strip():
+            merged_bal.append(str(row[self.balanceIndex]).strip())
+
+    def _finish(self):
+        merged_date, merged_desc, merged_ref, merged_amt, merged_bal = self.current
+        self.current = None
         # Join strategies
         # Date: Space joined (e.g., "01 Jun 2025 11:20 AM")
-        final_date = " ".join(merged_date)
-        
         # Description: Joined without separator based on "Payment from" example reconstruction
         # User example: "UPI/SHIVAMCLINIC..."
-        final_desc = "".join(merged_desc)
-        
-        # Ref: Joined without separator (usually single line, but simple concatenation is safest for split IDs)
-        final_ref = "".join(merged_ref)
-        
-        # Amount: Joined without separator
-        final_amt = "".join(merged_amt)
-        
-        # Balance: Joined without separator
-        final_bal = "".join(merged_bal)
-        
-        # Create single row for this transaction
-        merged_transactions.append([
-            final_date,
-            final_desc,
-            final_ref,
-            final_amt,
-            final_bal
-        ])
-        
-    return merged_transactions
+        # Ref, amount, balance: Joined without separator (simple concatenation is safest for split IDs)
+        return [
+            " ".join(merged_date),
+            "".join(merged_desc),
+            "".join(merged_ref),
+            "".join(merged_amt),
+            "".join(merged_bal),
+        ]
 
+
+def group_transactions(pages, page_number=None):
+    """
+    Groups raw table rows into merged transactions, pages taken on their own.
+    Args:
+        pages (list): A list of pages, where each page is a list of rows, and each row is a list of cell strings.
+    Returns:
+        list: A list of [date, details, ref, amount, balance] rows, one per transaction.
+    """
+    return TransactionGrouper().group(pages)
@@ -0,0 +1,208 @@
+import logging
+from bisect import bisect_right
+
+from pdfplumber import utils
+from pdfplumber.table import TableSettings
+
+log = logging.getLogger(__name__)
+
+# Vertical strategies whose columns come from ruling lines, so they can be replayed
+# on later pages. Text-aligned columns (Kotak) are re-detected on every page.
+RULED_STRATEGIES = ("lines", "lines_strict")
+# Fraction of the table height a column's ruling must cover on a later page
+MIN_COLUMN_COVERAGE = 0.9
+
+
+class LayoutTemplate:
+    """
+    Column geometry of a document's transaction table: its x-extent and the
+    x of every column boundary, learned from one fully detected page.
+    """
+
+    __slots__ = ("x0", "x1", "columns")
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.x0 = columns[0]
+        self.x1 = columns[-1]
+
+    @classmethod
+    def learn(cls, tables, tolerance):
+        """
+        Template from the largest table pdfplumber found, or None if it has no columns.
+        """
+        if not tables:
+            return None
+        table = max(tables, key=lambda t: (t.bbox[2] - t.bbox[0]) * (t.bbox[3] - t.bbox[1]))
+        columns = []
+        for x in sorted({x for cell in table.cells for x in (cell[0], cell[2])}):
+            if not columns or x - columns[-1] > tolerance:
+                columns.append(x)
+        if len(columns) < 3:
+            return None
+        return cls(columns)
+
+
+class DocumentLayout:
+    """
+    Table extraction for the pages of one document.
+    The first page is detected in full (edges, intersections, cells) and its
+    column boundaries become the template. Later pages only locate the table's
+    vertical extent, crop to it and pass the columns as explicit vertical lines.
+    A page whose rulings don't line up with the template is detected in full.
+    extract_fast / extract_full are the two tiers on their own (see
+    main._extract_tiered).
+    """
+
+    engine = "template"
+
+    def __init__(self, table_settings):
+        self.table_settings = table_settings
+        self.settings = TableSettings.resolve(table_settings)
+        self.enabled = self.settings.vertical_strategy in RULED_STRATEGIES
+        self.template = None
+        self.hits = 0
+        self.misses = 0
+
+    def extract_tables(self, page):
+        tables = self.extract_fast(page)
+        return tables if tables is not None else self.extract_full(page)
+
+    def extract_fast(self, page):
+        """
+        The page's tables through the template, or None when there is no
+        template yet or the page doesn't fit it.
+        """
+        if self.template is None:
+            return None
+        tables = self._extract_with_template(page)
+        if tables is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return tables
+
+    def extract_full(self, page):
+        """
+        Full detection; the first page that has columns becomes the template.
+        """
+        if not self.enabled:
+            return page.extract_tables(self.table_settings)
+
+        found = page.find_tables(self.settings)
+        if self.template is None:
+            self.template = LayoutTemplate.learn(found, self.settings.snap_x_tolerance)
+            if self.template is not None:
+                log.info("📐 Learned table layout on page %s: %s columns", page.page_number, len(self.template.columns) - 1)
+        return [table.extract(**(self.settings.text_settings or {})) for table in found]
+
+    def _table_extent(self, page):
+        """
+        (top, bottom) of the template table on this page, or None when the
+        page's vertical rulings are not exactly the template's columns.
+        """
+        template = self.template
+        tolerance = self.settings.snap_x_tolerance
+        v_edges = [e for e in page.edges if e["orientation"] == "v"]
+
+        spans = []
+        for x in template.columns:
+            hits = [e for e in v_edges if abs(e["x0"] - x) <= tolerance]
+            if not hits:
+                return None
+            spans.append(hits)
+
+        top = min(e["top"] for hits in spans for e in hits)
+        bottom = max(e["bottom"] for hits in spans for e in hits)
+        height = bottom - top
+        if height <= 0:
+            return None
+        for hits in spans:
+            if sum(e["bottom"] - e["top"] for e in hits) < height * MIN_COLUMN_COVERAGE:
+                return None
+
+        # Any other ruling (an extra column, a second boxed table) needs full detection
+        for e in v_edges:
+            if not any(abs(e["x0"] - x) <= tolerance for x in template.columns):
+                return None
+        return top, bottom
+
+    def _extract_with_template(self, page):
+        extent = self._table_extent(page)
+        if extent is None:
+            return None
+        template = self.template
+        pad = self.settings.snap_tolerance
+        px0, ptop, px1, pbottom = page.bbox
+        bbox = (
+            max(px0, template.x0 - pad),
+            max(ptop, extent[0] - pad),
+            min(px1, template.x1 + pad),
+            min(pbottom, extent[1] + pad),
+        )
+
+        settings = dict(self.table_settings)
+        settings["vertical_strategy"] = "explicit"
+        settings["explicit_vertical_lines"] = template.columns
+        found = page.crop(bbox).find_tables(settings)
+        if len(found) != 1:
+            return None
+        table = _extract_grid(found[0], self.settings.text_settings or {})
+        if table is None or any(len(row) != len(template.columns) - 1 for row in table):
+            return None
+        return [table]
+
+
+def _extract_grid(table, text_settings):
+    """
+    Table.extract() for a regular grid (every row complete, columns aligned):
+    each char is dropped straight into its cell by bisecting the row tops and
+    column x's, instead of rescanning every char for each row and cell.
+    Returns None when the table is not a regular grid.
+    """
+    rows = table.rows
+    if not rows or any(cell is None for cell in rows[0].cells):
+        return None
+    xs = [cell[0] for cell in rows[0].cells] + [rows[0].cells[-1][2]]
+    tops, bottoms = [], []
+    for row in rows:
+        cells = row.cells
+        if any(cell is None for cell in cells):
+            return None
+        if [cell[0] for cell in cells] != xs[:-1] or [cell[2] for cell in cells] != xs[1:]:
+            return None
+        top, bottom = cells[0][1], cells[0][3]
+        if any(cell[1] != top or cell[3] != bottom for cell in cells):
+            return None
+        if bottoms and top < bottoms[-1]:
+            return None
+        tops.append(top)
+        bottoms.append(bottom)
+
+    n_cols = len(xs) - 1
+    buckets = [[[] for _ in range(n_cols)] for _ in rows]
+    # Same membership test as Table.extract: the char's midpoint, half-open bboxes
+    for char in table.page.chars:
+        v_mid = (char["top"] + char["bottom"]) / 2
+        r = bisect_right(tops, v_mid) - 1
+        if r < 0 or v_mid >= bottoms[r]:
+            continue
+        c = bisect_right(xs, (char["x0"] + char["x1"]) / 2) - 1
+        if 0 <= c < n_cols:
+            buckets[r][c].append(char)
+
+    kwargs = dict(text_settings)
+    result = []
+    for r, row in enumerate(rows):
+        out = []
+        for cell, cell_chars in zip(row.cells, buckets[r]):
+            if not cell_chars:
+                out.append("")
+                continue
+            if "layout" in kwargs:
+                kwargs["layout_width"] = cell[2] - cell[0]
+                kwargs["layout_height"] = cell[3] - cell[1]
+                kwargs["layout_bbox"] = cell
+            out.append(utils.extract_text(cell_chars, **kwargs))
+        result.append(out)
+    return result
@@ -0,0 +1,74 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+from config import config
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    "2025-01-01 12:00:00 INFO main: 📦 Processing page page=3 pages=40"
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = _fields(record)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message and the `extra` fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup():
+    """
+    Route this process's logging through a queue to one stdout handler on a
+    background thread, so parsing threads only enqueue records and never
+    block on stdout. LOG_LEVEL and LOG_FORMAT ("text" / "json") apply.
+    Safe to call more than once; does nothing if the root logger is already
+    configured by someone else.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None or root.handlers:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(config.LOG_LEVEL)
@@ -1,124 +1,865 @@
 import kotakBank
+import asyncio
+import io
+import logging
+import os
 import sys
 import pdfplumber
-import json
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
 
-def _process_single_page(pdf_path, page_num, bank_name, password):
+from config import config
+from bank_registry import get_parser, UnknownBankError
+from bank_detection import detect_bank, needs_detection
+from document import DocumentSession, LazyPages, PasswordError, SharedBytes, close_pdf, decrypted_copy
+from fingerprint import page_fingerprint
+from layout_template import DocumentLayout
+from word_engine import WordColumnLayout
+from memory import MemoryGuard, MemoryLimitExceeded, release_memory
+from records import DocumentInfo, PageResult
+from balance_check import chain_holds
+from grouping import rows_of
+import logs
+import metrics
+
+log = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+# Bump whenever a change alters parser output, so cached results are not replayed
+PARSER_VERSION = "4"
+
+def cache_version():
+    """
+    PARSER_VERSION plus the settings that change which tables extraction
+    produces, for page and result cache keys: output cached under other
+    settings is never replayed.
+    """
+    return (
+        f"{PARSER_VERSION}"
+        f";words={','.join(sorted(config.PARSE_WORD_ENGINE_BANKS))}"
+        f";template={config.PARSE_LAYOUT_TEMPLATE}"
+        f";balance_check={config.PARSE_BALANCE_CHECK}"
+    )
+
+def _document_layout(bank_name):
+    """
+    Per-document fast extraction tier (see _extract_tiered): the word-bucketing engine for banks listed in
+    PARSE_WORD_ENGINE_BANKS (word_engine.py), otherwise the layout template learner
+    (layout_template.py), or None for plain page.extract_tables.
+    """
+    parser = get_parser(bank_name)
+    if parser.header_columns and bank_name in config.PARSE_WORD_ENGINE_BANKS:
+        return WordColumnLayout(parser.header_columns, parser.table_settings)
+    if not config.PARSE_LAYOUT_TEMPLATE:
+        return None
+    return DocumentLayout(parser.table_settings)
+
+def _extract_tiered(page, page_num, parser, layout, timings):
+    """
+    Cheapest extraction first. The layout's fast tier (word engine or layout
+    template) is trusted only if the page's transactions, grouped on their
+    own, form an unbroken balance chain (balance_check.chain_holds); otherwise,
+    and on pages the fast tier can't handle, the page is extracted with the
+    bank's full table_settings. Returns (tables, tier).
+    """
+    if layout is not None:
+        start = time.perf_counter()
+        tables = layout.extract_fast(page)
+        timings["extract_tables"] = time.perf_counter() - start
+        if tables is not None:
+            if not config.PARSE_BALANCE_CHECK:
+                return tables, layout.engine
+            start = time.perf_counter()
+            # group_transactions may pad rows in place; the consumer groups these tables again
+            grouped = parser.group_transactions([[list(row) for row in table] for table in tables], page_num)
+            holds = chain_holds(parser.generate_structured_output(grouped) if grouped else [])
+            timings["balance_check"] = time.perf_counter() - start
+            if holds:
+                return tables, layout.engine
+            log.debug("Balance chain broken, extracting the page in full",
+                      extra={"page": page_num, "tier": layout.engine})
+
+    start = time.perf_counter()
+    tables = layout.extract_full(page) if layout is not None else page.extract_tables(parser.table_settings)
+    timings["extract_tables"] = timings.get("extract_tables", 0.0) + time.perf_counter() - start
+    return tables, "tables"
+
+def _extract_page(page, page_num, bank_name, page_cache=None, fingerprint_memo=None, layout=None):
+    """
+    Extract one page's tables (the part of parsing that can run on any worker;
+    grouping needs the pages before it, see _DocumentGrouper).
+    With a page_cache, a page whose content fingerprint was seen before
+    (in any file) reuses the stored tables instead of being extracted.
+    A layout (see _document_layout) is tried first, see _extract_tiered.
+    Returns (tables, from_cache, timings, tier): timings holds the seconds spent
+    in each stage (cache, extract_tables, balance_check).
+    """
+    parser = get_parser(bank_name)
+    timings = {}
+
+    fingerprint = None
+    if page_cache is not None:
+        start = time.perf_counter()
+        fingerprint = page_fingerprint(
+            page, parser.bank_name, parser.table_settings, cache_version(), fingerprint_memo
+        )
+        cached = page_cache.get(fingerprint)
+        timings["cache"] = time.perf_counter() - start
+        if cached is not None:
+            tables, tier = cached
+            return tables, True, timings, tier
+
+    tables, tier = _extract_tiered(page, page_num, parser, layout, timings)
+
+    if page_cache is not None:
+        page_cache.put(fingerprint, tables, tier)
+    return tables, False, timings, tier
+
+def _has_page(pages, index):
+    """
+    LazyPages.has_page, with a broken page tree taken as its end (iterating
+    the pages then reports it).
+    """
+    try:
+        return pages.has_page(index)
+    except Exception:
+        return False
+
+class _DocumentGrouper:
+    """
+    Groups and structures one document's pages, which must arrive in page order.
+    The bank's grouper keeps the header mapping and the open transaction across
+    pages, so each page's result holds the transactions that closed on it: one
+    that runs onto the next page is reported there.
+    Results pass through emit(), which sends each one on at once unless it may
+    be the last page; that one waits for finish(), which adds the transaction
+    still open once the pages run out to the last page actually parsed,
+    whatever /Count said.
+    """
+
+    __slots__ = ("parser", "grouper", "held")
+
+    def __init__(self, bank_name):
+        self.parser = get_parser(bank_name)
+        self.grouper = self.parser.new_grouper()
+        self.held = None
+
+    def _structure(self, grouped, timings):
+        start = time.perf_counter()
+        transactions = self.parser.generate_structured_output(grouped) if grouped else []
+        timings["generate_structured_output"] = time.perf_counter() - start
+        return transactions
+
+    def page_result(self, page_num, tables, from_cache, timings, tier=None):
+        # Group transactions using bank-specific logic
+        start = time.perf_counter()
+        self.grouper.start_page()
+        grouped = list(self.grouper.feed(rows_of(tables)))
+        timings["group_transactions"] = time.perf_counter() - start
+        transactions = self._structure(grouped, timings)
+        return PageResult(page_num, transactions, cached=from_cache, timings=timings, tier=tier)
+
+    def error_result(self, page_num, error):
+        """
+        A page that failed (or the parse stopping before the last page) ends the
+        open transaction; it is reported with the error.
+        """
+        try:
+            transactions = self._structure(list(self.grouper.close()), {})
+        except Exception as e:
+            log.error("❌ Error closing the open transaction: %s", e, extra={"page": page_num})
+            transactions = []
+        return PageResult(page_num, transactions, error=error)
+
+    def emit(self, result, last):
+        """
+        Yields what can be sent now: `result`, unless it is (or may be) the
+        document's `last` page, which is kept back for finish().
+        """
+        if self.held is not None:
+            # Held as the last page, but the page tree went on after all
+            yield self.held
+            self.held = None
+        if last:
+            self.held = result
+        else:
+            yield result
+
+    def finish(self):
+        """
+        Yields the held result with the transaction still open at the end
+        added to it. Call once no more pages will come.
+        """
+        result, self.held = self.held, None
+        try:
+            timings = {}
+            closed = self._structure(list(self.grouper.close()), timings)
+        except Exception as e:
+            log.error("❌ Error closing the open transaction: %s", e)
+            closed, timings = [], {}
+        if result is None:
+            return
+        if closed:
+            result.transactions.extend(closed)
+            result.timings = {**(result.timings or {}), **timings}
+        yield result
+
+# Open documents kept by each worker (thread-local so pool threads never share one)
+WORKER_DOCUMENT_CACHE_SIZE = 2
+_worker_state = threading.local()
+
+def _open_worker_document(doc_key, source, password):
     """
-    Worker function for ProcessPoolExecutor.
-    Each process opens the PDF independently to avoid thread/process safety issues.
+    Return this worker's open copy of the document, opening it on first use.
+    Only the most recently used documents stay open.
+    """
+    documents = getattr(_worker_state, "documents", None)
+    if documents is None:
+        documents = _worker_state.documents = OrderedDict()
+
+    key = (doc_key, password)
+    entry = documents.get(key)
+    if entry is not None:
+        documents.move_to_end(key)
+        return entry
+
+    if isinstance(source, SharedBytes):
+        source = source.read()
+    pdf = pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source, password=password)
+    # (document, its pages, fingerprint memo shared by its pages, layout learned per bank)
+    entry = documents[key] = (pdf, LazyPages(pdf), {}, {})
+    while len(documents) > WORKER_DOCUMENT_CACHE_SIZE:
+        _, (stale, _, _, _) = documents.popitem(last=False)
+        close_pdf(stale)
+    return entry
+
+def _process_single_page(pdf_path, page_num, bank_name, password, doc_key=None, page_cache=None):
+    """
+    Worker function for ThreadPoolExecutor / ProcessPoolExecutor.
+    Each worker opens the PDF independently to avoid thread/process safety issues,
+    and keeps it open for the other pages of the same document (`doc_key`).
+    `pdf_path` is either a filesystem path or the raw PDF bytes.
+    Returns _extract_page's (tables, from_cache, timings, tier).
     """
-    import pdfplumber
-    import traceback
-    
     try:
-        # Re-import logic based on bank_name inside the process
-        match bank_name:
-            case "UNION BANK OF INDIA":
-                from unionBank.grouping_logic import group_transactions
-                from unionBank.table_settings import table_settings
-            case "HDFC BANK":
-                from hdfcBank.grouping_logic import group_transactions
-                from hdfcBank.table_settings import table_settings
-            case "ICICI BANK":
-                from iciciBank.grouping_logic import group_transactions
-                from iciciBank.table_settings import table_settings
-            case "KARNAVATI BANK":
-                from karnavatiBank.grouping_logic import group_transactions
-                from karnavatiBank.table_settings import table_settings
-            case "KOTAK MAHINDRA BANK" | _:
-                from kotakBank.grouping_logic import group_transactions
-                from kotakBank.table_settings import table_settings
-
-        with pdfplumber.open(pdf_path, password=password) as pdf:
-            page = pdf.pages[page_num - 1]
-            print(f"Processing page {page_num} in process...")
-            tables = page.extract_tables(table_settings)
-            return group_transactions(tables, page_num)
+        _, pages, fingerprint_memo, layouts = _open_worker_document(doc_key or pdf_path, pdf_path, password)
+        if bank_name not in layouts:
+            layouts[bank_name] = _document_layout(bank_name)
+        page = pages[page_num - 1]
+        log.debug("Processing page in worker", extra={"page": page_num, "bank": bank_name})
+        try:
+            return _extract_page(page, page_num, bank_name, page_cache, fingerprint_memo, layouts[bank_name])
+        finally:
+            # The document stays open, so drop this page's layout caches now
+            page.close()
+            if config.PARSE_LOW_MEMORY:
+                release_memory()
             
+    except Exception:
+        log.exception("❌ Error on page %s in worker", page_num, extra={"page": page_num, "bank": bank_name})
+        # Re-raise so the caller reports the error on this page's result
+        raise
+
+def _worker_source(pdf_file, spill_to_disk):
+    """
+    Workers cannot share an open file object, so hand them a path when we
+    have one and the raw bytes otherwise. Process workers would receive the
+    bytes pickled with every page, so for them the bytes are spilled to a
+    temp file once. Returns (source, temp_path_to_remove).
+    """
+    if isinstance(pdf_file, (str, os.PathLike)):
+        return os.fspath(pdf_file), None
+    if isinstance(pdf_file, io.BytesIO):
+        # getvalue() leaves the stream position alone for a session sharing it
+        data = pdf_file.getvalue()
+    elif hasattr(pdf_file, "read"):
+        pdf_file.seek(0)
+        data = pdf_file.read()
+    else:
+        data = bytes(pdf_file)
+    if not spill_to_disk:
+        return data, None
+    os.makedirs(config.UPLOAD_TMP_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(prefix="upload_", suffix=".pdf", dir=config.UPLOAD_TMP_DIR, delete=False) as spill:
+        spill.write(data)
+    return spill.name, spill.name
+
+def _decrypt_for_workers(pdf_file, password, spill_to_disk):
+    """
+    Decrypt an encrypted document once for all of its workers, which then open
+    the copy without a password: thread workers share the bytes, process
+    workers read them from shared memory (a decrypted statement is never
+    spilled to disk). Returns None if that fails; workers then decrypt the
+    original themselves.
+    """
+    try:
+        start = time.perf_counter()
+        data = decrypted_copy(pdf_file, password)
+        log.debug("🔓 Decrypted once for the workers", extra={"seconds": round(time.perf_counter() - start, 3)})
+        return SharedBytes.create(data) if spill_to_disk else data
+    except Exception as e:
+        log.warning("Could not decrypt the document for the workers: %s", e)
+        return None
+
+def resolve_bank(session, bank_name, timings=None):
+    """
+    The bank to parse with. A missing, "AUTO" or unknown name is detected
+    from page 1 instead of running a wrong parser over the whole document
+    (timed as "detect" in `timings`).
+    """
+    if not needs_detection(bank_name):
+        return bank_name
+    start = time.perf_counter()
+    detected = detect_bank(session)
+    if timings is not None:
+        timings["detect"] = time.perf_counter() - start
+    if detected is None:
+        raise UnknownBankError(f"Could not detect the bank layout (bank_name={bank_name!r})")
+    log.info("🔎 Detected bank: %s", detected, extra={"bank": detected})
+    return detected
+
+def _bank_error(e):
+    log.error("❌ %s", e.args[0])
+    return PageResult(0, error=e.args[0])
+
+def _memory_error(page_num, e):
+    log.error("❌ %s", e, extra={"page": page_num})
+    return PageResult(page_num, error=str(e))
+
+def _open_error(e):
+    if isinstance(e, PasswordError):
+        log.error("❌ %s", e)
+        return PageResult(0, error=str(e))
+    log.error("❌ Failed to open PDF: %s", e)
+    return PageResult(0, error=f"Failed to open PDF: {str(e)}")
+
+def _open_session(pdf_file, password):
+    """
+    Use the caller's DocumentSession as-is (the caller closes it),
+    otherwise open one just for this call.
+    """
+    if isinstance(pdf_file, DocumentSession):
+        return nullcontext(pdf_file)
+    return DocumentSession(pdf_file, password=password)
+
+def open_document(pdf_file, bank_name, password):
+    """
+    Open `pdf_file` (a DocumentSession is used as-is) and resolve its bank.
+    Returns (session, DocumentInfo, None), or (None, DocumentInfo, error record)
+    when it can't be parsed (a wrong or missing password, an unknown layout...);
+    a session opened here is then closed again.
+    """
+    info = DocumentInfo(bank_name)
+    session = None
+    try:
+        start = time.perf_counter()
+        session = pdf_file if isinstance(pdf_file, DocumentSession) else DocumentSession(pdf_file, password=password)
+        info.timings = _open_timings(pdf_file, start)
+        try:
+            info.page_count = session.page_count
+        except Exception as e:
+            # Only reported; the page tree is walked as pages are scheduled
+            log.warning("Error reading page count: %s", e)
+        info.bank_name = resolve_bank(session, bank_name, info.timings)
+        return session, info, None
+    except Exception as e:
+        if session is not None and session is not pdf_file:
+            session.close()
+        error = _bank_error(e) if isinstance(e, UnknownBankError) else _open_error(e)
+        info.error = error.error
+        return None, info, error
+
+def _open_timings(pdf_file, start):
+    """
+    Stage timings of a document, reported with its first page: "open" since
+    `start` unless the caller opened the session.
+    """
+    if isinstance(pdf_file, DocumentSession):
+        return {}
+    return {"open": time.perf_counter() - start}
+
+class _ScheduledDocument:
+    """
+    One document of a parallel parse: what its workers open, its pages in flight
+    and the grouper its pages go through as they are collected.
+    Pages are scheduled as the session's page tree is walked (LazyPages), never
+    from /Count, so workers are only sent pages that exist.
+    """
+
+    __slots__ = ("file_id", "bank_name", "password", "source", "spill_path", "doc_key",
+                 "session", "owns_session", "walk_error", "next_page", "pending", "open_timings", "grouper")
+
+    def __init__(self, file_id, bank_name, password, source, spill_path, session, owns_session, open_timings=None):
+        self.file_id = file_id
+        self.bank_name = bank_name
+        self.password = password
+        self.source = source
+        self.spill_path = spill_path
+        self.doc_key = f"{uuid.uuid4().hex}:{source if isinstance(source, str) else 'bytes'}"
+        # Open until the page tree is walked to its end
+        self.session = session
+        self.owns_session = owns_session
+        self.walk_error = None
+        self.next_page = 1
+        self.pending = deque()
+        # Open / detect timings, reported with the first page
+        self.open_timings = open_timings
+        self.grouper = _DocumentGrouper(bank_name)
+
+    @property
+    def walked_all(self):
+        return self.session is None
+
+    def has_next_page(self):
+        """
+        Walk the page tree as far as next_page. Once it runs out (or turns out
+        to be broken, kept in walk_error) the session is closed.
+        """
+        if self.session is not None:
+            try:
+                if self.session.pages.has_page(self.next_page - 1):
+                    return True
+            except Exception as e:
+                self.walk_error = e
+            self.close_session()
+        return False
+
+    def close_session(self):
+        if self.session is not None and self.owns_session:
+            self.session.close()
+        self.session = None
+
+    def remove_spill(self):
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.spill_path = None
+        if isinstance(self.source, SharedBytes):
+            self.source.unlink()
+
+def _prepare_document(file_id, pdf_file, bank_name, password, spill_to_disk):
+    """
+    Resolve the bank on a session that stays open to walk the page tree
+    (workers open their own copies).
+    Returns (_ScheduledDocument, DocumentInfo, None), or (None, DocumentInfo,
+    error record) if it can't be parsed.
+    """
+    session, info, error = open_document(pdf_file, bank_name, password)
+    if error is not None:
+        return None, info, error
+    owns_session = session is not pdf_file
+    bank_name = info.bank_name
+    try:
+        has_pages = session.pages.has_page(0)
+        if not owns_session:
+            password = pdf_file.password
+            pdf_file = pdf_file.source
+        decrypted = None
+        if session.is_encrypted and has_pages and config.PARSE_DECRYPT_ONCE:
+            decrypted = _decrypt_for_workers(pdf_file, password, spill_to_disk)
+        if decrypted is not None:
+            source, spill_path, password = decrypted, None, None
+        else:
+            source, spill_path = _worker_source(pdf_file, spill_to_disk)
     except Exception as e:
-        print(f"❌ Error on page {page_num} in process: {e}")
-        traceback.print_exc()
-        return []
+        if owns_session:
+            session.close()
+        return None, info, _open_error(e)
+    doc = _ScheduledDocument(file_id, bank_name, password, source, spill_path, session, owns_session, info.timings)
+    if not has_pages:
+        doc.close_session()
+    return doc, info, None
+
+def _iter_documents_parallel(documents, executor, max_workers, max_in_flight, page_cache=None, announce=False):
+    """
+    Fan the pages of one or more documents out to a thread/process pool.
+    `documents` yields (file_id, pdf_file, bank_name, password), each opened
+    only when the pool has room for its pages. With `announce`, a document's
+    DocumentInfo is yielded as soon as it is opened, ahead of its pages, and
+    carries the open / detect timings the first page would otherwise get.
+    Pages are submitted file after file, and at most `max_in_flight` are in flight
+    across all files, so memory stays bounded no matter how long the statements are
+    and the pool never sits idle at a file boundary.
+    Yields (file_id, page_result): every file's pages in page order, files
+    interleaved as their pages complete.
+    `executor` is a mode name (a pool is created for this call) or a shared
+    Executor that outlives it (see worker_pool.py).
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    owns_pool = not isinstance(executor, Executor)
+    if owns_pool:
+        if executor == "process":
+            # Workers set up logging of their own
+            pool = ProcessPoolExecutor(max_workers=max_workers, initializer=logs.setup)
+        else:
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        pool = executor
+    spill_to_disk = isinstance(pool, ProcessPoolExecutor)
+
+    remaining = iter(documents)
+    # Documents with pages still to submit, and every document with pages in flight
+    to_submit = deque()
+    active = []
+    # DocumentInfo and error records of documents just opened
+    opened = deque()
+    in_flight = 0
+    limit_error = None
+    guard = MemoryGuard()
+
+    def refill():
+        nonlocal in_flight, limit_error
+        while in_flight < max_in_flight and limit_error is None:
+            if not to_submit:
+                # Open the next document only once the pool has room for its pages
+                item = next(remaining, None)
+                if item is None:
+                    return
+                doc, info, error = _prepare_document(*item, spill_to_disk)
+                if announce:
+                    opened.append((item[0], info))
+                if error is not None:
+                    opened.append((item[0], error))
+                    continue
+                if announce:
+                    doc.open_timings = None
+                if not doc.walked_all:
+                    to_submit.append(doc)
+                    active.append(doc)
+                else:
+                    doc.remove_spill()
+                continue
+            try:
+                # Raises MemoryLimitExceeded before more pages are loaded
+                guard.check()
+            except MemoryLimitExceeded as e:
+                # Let the pages already in flight finish, then stop
+                limit_error = e
+                return
+            doc = to_submit[0]
+            future = pool.submit(
+                _process_single_page, doc.source, doc.next_page, doc.bank_name, doc.password,
+                doc.doc_key, page_cache
+            )
+            doc.pending.append((doc.next_page, future))
+            doc.next_page += 1
+            in_flight += 1
+            metrics.PAGES_IN_FLIGHT.inc()
+            if not doc.has_next_page():
+                to_submit.popleft()
+
+    try:
+        refill()
+        while True:
+            while opened:
+                yield opened.popleft()
+            heads = [doc.pending[0][1] for doc in active if doc.pending]
+            if not heads:
+                break
+            wait(heads, return_when=FIRST_COMPLETED)
+
+            for doc in list(active):
+                while doc.pending and doc.pending[0][1].done():
+                    page_num, future = doc.pending.popleft()
+                    in_flight -= 1
+                    metrics.PAGES_IN_FLIGHT.dec()
+                    try:
+                        tables, from_cache, timings, tier = future.result()
+                        if page_cache is not None and not from_cache:
+                            page_cache.written()
+                        # Grouping carries state from page to page, so it runs here, in order
+                        result = doc.grouper.page_result(page_num, tables, from_cache, timings, tier)
+                    except Exception as e:
+                        result = doc.grouper.error_result(page_num, str(e))
+                    if doc.open_timings:
+                        result.timings = {**doc.open_timings, **(result.timings or {})}
+                        doc.open_timings = None
+                    # Keep the workers busy while the caller consumes this page
+                    refill()
+                    log.debug("📦 Processed page", extra={"page": page_num})
+                    guard.page_done(page_num)
+                    # has_next_page() ran when this page was submitted, so walked_all tells if it is the last
+                    last = doc.walked_all and page_num == doc.next_page - 1
+                    for result in doc.grouper.emit(result, last):
+                        yield doc.file_id, result
+                if not doc.pending and doc.walked_all:
+                    active.remove(doc)
+                    doc.remove_spill()
+                    for result in doc.grouper.finish():
+                        yield doc.file_id, result
+                    if doc.walk_error is not None:
+                        yield doc.file_id, _open_error(doc.walk_error)
+
+        if limit_error is not None:
+            for doc in to_submit:
+                for result in doc.grouper.finish():
+                    yield doc.file_id, result
+                yield doc.file_id, _memory_error(doc.next_page, limit_error)
+            for item in remaining:
+                if announce:
+                    yield item[0], DocumentInfo(item[2])
+                yield item[0], _memory_error(1, limit_error)
+    finally:
+        metrics.PAGES_IN_FLIGHT.dec(in_flight)
+        if owns_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            for doc in active:
+                for _, future in doc.pending:
+                    future.cancel()
+        for doc in active:
+            doc.close_session()
+            doc.remove_spill()
 
-def process_bank_statement_pdf(pdf_file, bank_name="UNION BANK OF INDIA", password=None):
+def _iter_pages_parallel(pdf_file, bank_name, password, executor, max_workers, max_in_flight,
+                         page_cache=None):
+    """
+    One document through _iter_documents_parallel; yields results in page order.
+    """
+    documents = [(None, pdf_file, bank_name, password)]
+    for _, result in _iter_documents_parallel(documents, executor, max_workers, max_in_flight, page_cache):
+        yield result
+
+def process_bank_statement_pdf(pdf_file, bank_name="UNION BANK OF INDIA", password=None,
+                               executor=None, max_workers=None, max_in_flight=None, page_cache=None):
     """
     Process PDF using pdfplumber and the specified bank parser.
-    Uses ProcessPoolExecutor for parallel processing and isolation.
-    Yields results page-by-page.
-    """
-    from concurrent.futures import ProcessPoolExecutor
-    
-    # We need to import the parser components for the main process
-    match bank_name:
-        case "UNION BANK OF INDIA":
-            from unionBank.structured_output import generate_structured_output
-            from unionBank.grouping_logic import group_transactions
-            from unionBank.table_settings import table_settings
-        case "HDFC BANK":
-            from hdfcBank.structured_output import generate_structured_output
-            from hdfcBank.grouping_logic import group_transactions
-            from hdfcBank.table_settings import table_settings
-        case "ICICI BANK":
-            from iciciBank.structured_output import generate_structured_output
-            from iciciBank.grouping_logic import group_transactions
-            from iciciBank.table_settings import table_settings
-        case "KARNAVATI BANK":
-            from karnavatiBank.structured_output import generate_structured_output
-            from karnavatiBank.grouping_logic import group_transactions
-            from karnavatiBank.table_settings import table_settings
-        case "KOTAK MAHINDRA BANK" | _:
-            from kotakBank.structured_output import generate_structured_output
-            from kotakBank.grouping_logic import group_transactions
-            from kotakBank.table_settings import table_settings
+    Yields a records.PageResult per page, always in page order, holding the
+    transactions that closed on that page (see _DocumentGrouper).
+
+    pdf_file: path, file-like object, or an open DocumentSession (password is then ignored).
+    bank_name: a registered bank, or None / "AUTO" to detect it from page 1.
+    executor: "inline" (default) parses pages one after another in this process,
+              "thread" / "process" parse pages in parallel on a worker pool,
+              or pass a long-lived Executor (worker_pool.get_pool()) to reuse it.
+    max_workers: pool size when a pool is created for this call.
+    max_in_flight: how many pages may be submitted ahead of the one being yielded.
+    page_cache: optional result_cache.PageCache; pages seen before are not re-extracted.
+    """
+    executor = executor or config.PARSE_EXECUTOR
+    if not isinstance(executor, Executor) and executor not in EXECUTOR_MODES:
+        raise ValueError(f"Unknown executor '{executor}', expected one of {EXECUTOR_MODES}")
+    max_workers = max_workers or config.PARSE_MAX_WORKERS
+    max_in_flight = max_in_flight or config.PARSE_MAX_IN_FLIGHT or 2 * max_workers
+
+    if executor != "inline":
+        try:
+            yield from _iter_pages_parallel(
+                pdf_file, bank_name, password, executor, max_workers, max_in_flight, page_cache
+            )
+        except Exception as e:
+            yield _open_error(e)
+        return
 
     # Process pages sequentially for memory stability on hosted environments (like Render)
+    grouper = None
     try:
-        with pdfplumber.open(pdf_file, password=password) as pdf:
-            page_count = len(pdf.pages)
+        start = time.perf_counter()
+        with _open_session(pdf_file, password) as session:
+            open_timings = _open_timings(pdf_file, start)
+            fingerprint_memo = {}
+            try:
+                bank_name = resolve_bank(session, bank_name, open_timings)
+            except UnknownBankError as e:
+                yield _bank_error(e)
+                return
+            layout = _document_layout(bank_name)
+            grouper = _DocumentGrouper(bank_name)
+            guard = MemoryGuard(trim=session.trim)
             
-            for i in range(page_count):
-                page_num = i + 1
+            for page_num, page in enumerate(session.pages, start=1):
                 try:
-                    print(f"📦 Processing page {page_num}/{page_count}...")
-                    page = pdf.pages[i]
-                    
-                    # Extract tables using settings
-                    tables = page.extract_tables(table_settings)
-                    # Group transactions using bank-specific logic
-                    grouped_txns = group_transactions(tables, page_num)
-                    
-                    if grouped_txns:
-                        page_txns = generate_structured_output(grouped_txns)
-                        yield {
-                            "page": page_num,
-                            "transactions": page_txns
-                        }
-                    else:
-                        yield {
-                            "page": page_num,
-                            "transactions": []
-                        }
+                    guard.check()
+                except MemoryLimitExceeded as e:
+                    yield from grouper.finish()
+                    yield _memory_error(page_num, e)
+                    return
+                try:
+                    log.debug("📦 Processing page", extra={"page": page_num})
+                    try:
+                        tables, from_cache, timings, tier = _extract_page(
+                            page, page_num, bank_name, page_cache, fingerprint_memo, layout
+                        )
+                    finally:
+                        # Free chars/objects/layout before yielding, or every page
+                        # stays in memory until the document is closed
+                        page.close()
+                    if page_cache is not None and not from_cache:
+                        page_cache.written()
+                    result = grouper.page_result(page_num, tables, from_cache, timings, tier)
                 except Exception as e:
-                    print(f"❌ Error on page {page_num}: {e}")
-                    yield {
-                        "page": page_num,
-                        "error": str(e),
-                        "transactions": []
-                    }
+                    log.error("❌ Error on page %s: %s", page_num, e, extra={"page": page_num})
+                    result = grouper.error_result(page_num, str(e))
+                if open_timings:
+                    result.timings = {**open_timings, **(result.timings or {})}
+                    open_timings = None
+                guard.page_done(page_num)
+                yield from grouper.emit(result, not _has_page(session.pages, page_num))
+            yield from grouper.finish()
     except Exception as e:
-        print(f"❌ Failed to open PDF: {e}")
-        yield {
-            "page": 0,
-            "error": f"Failed to open PDF: {str(e)}",
-            "transactions": []
-        }
+        if grouper is not None:
+            yield from grouper.finish()
+        yield _open_error(e)
+
+def process_batch(documents, executor=None, max_workers=None, max_in_flight=None, page_cache=None):
+    """
+    Parse several statements as one job.
+    `documents` is an iterable of (file_id, pdf_file, bank_name, password), each
+    taking the same values as process_bank_statement_pdf. A file is opened only
+    when it is its turn, so there is never more than a window's worth open.
+    On a worker pool the pages of all files share one window of `max_in_flight`
+    pages, so the next file starts while the last pages of the previous one are
+    still being parsed. Inline, files are parsed one after another.
+    Yields (file_id, records.DocumentInfo) when a file is opened, then
+    (file_id, page_result) for its pages: every file's pages in page order,
+    files interleaved as their pages complete.
+    """
+    executor = executor or config.PARSE_EXECUTOR
+    if not isinstance(executor, Executor) and executor not in EXECUTOR_MODES:
+        raise ValueError(f"Unknown executor '{executor}', expected one of {EXECUTOR_MODES}")
+    max_workers = max_workers or config.PARSE_MAX_WORKERS
+    max_in_flight = max_in_flight or config.PARSE_MAX_IN_FLIGHT or 2 * max_workers
+
+    if executor == "inline":
+        for file_id, pdf_file, bank_name, password in documents:
+            session, info, error = open_document(pdf_file, bank_name, password)
+            yield file_id, info
+            if error is not None:
+                yield file_id, error
+                continue
+            try:
+                for result in process_bank_statement_pdf(
+                    session, bank_name=info.bank_name, executor="inline", page_cache=page_cache
+                ):
+                    yield file_id, result
+            finally:
+                if session is not pdf_file:
+                    session.close()
+        return
+
+    yield from _iter_documents_parallel(documents, executor, max_workers, max_in_flight, page_cache, announce=True)
+
+async def _aiter_in_thread(iterate, queue_size):
+    """
+    Run the blocking generator returned by `iterate()` in a background thread and
+    hand its items back through an asyncio queue, so the event loop stays free
+    while pages are being extracted.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        try:
+            items = iterate()
+            try:
+                for item in items:
+                    if stop.is_set():
+                        break
+                    put(item)
+            except Exception as e:
+                if not stop.is_set():
+                    put(e)
+            finally:
+                items.close()
+                if not stop.is_set():
+                    put(done)
+        finally:
+            loop.call_soon_threadsafe(finished.set_result, None)
+
+    # A thread of its own, not the loop's default executor: it is held for the
+    # whole parse, and consumers await asyncio.to_thread between items, which
+    # would deadlock once concurrent parses filled the default executor
+    finished = loop.create_future()
+    threading.Thread(target=produce, name="parse-producer", daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Consumer went away (or finished): let the producer thread wind down
+        stop.set()
+        while not queue.empty():
+            queue.get_nowait()
+        await asyncio.shield(finished)
+
+async def aprocess_bank_statement_pdf(pdf_file, bank_name="UNION BANK OF INDIA", password=None,
+                                      executor=None, max_workers=None, max_in_flight=None, page_cache=None,
+                                      queue_size=2):
+    """
+    Async counterpart of process_bank_statement_pdf for the API.
+    Pages are parsed in a background thread (which may itself fan out to a
+    worker pool) and handed back through an asyncio queue, so the event loop
+    stays free while a page is being extracted. Yields results in page order.
+    """
+    pages = _aiter_in_thread(
+        lambda: process_bank_statement_pdf(
+            pdf_file, bank_name=bank_name, password=password,
+            executor=executor, max_workers=max_workers, max_in_flight=max_in_flight, page_cache=page_cache
+        ),
+        queue_size,
+    )
+    async for page_result in pages:
+        yield page_result
+
+async def aprocess_batch(documents, executor=None, max_workers=None, max_in_flight=None, page_cache=None,
+                         queue_size=2):
+    """
+    Async counterpart of process_batch; yields (file_id, DocumentInfo or page_result).
+    """
+    results = _aiter_in_thread(
+        lambda: process_batch(
+            documents, executor=executor, max_workers=max_workers, max_in_flight=max_in_flight,
+            page_cache=page_cache
+        ),
+        queue_size,
+    )
+    async for item in results:
+        yield item
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python main.py <pdf_path> <output_path>")
-    else:
-        # Simple CLI wrapper
-        txns = process_bank_statement_pdf(sys.argv[1])
-        # with open(sys.argv[2], 'w') as f:
-        #     json.dump(txns, f, indent=4)
+    import argparse
+    import exporters
+    from bank_detection import AUTO
+
+    cli = argparse.ArgumentParser(description="Parse a bank statement PDF into NDJSON, CSV, Parquet or Arrow.")
+    cli.add_argument("pdf_path")
+    cli.add_argument("output_path")
+    cli.add_argument("--bank", default=AUTO, help="bank name (default: detect from page 1)")
+    cli.add_argument("--password")
+    cli.add_argument("--format", choices=tuple(exporters.FORMATS),
+                     help="output format (default: from the output file extension, else ndjson)")
+    args = cli.parse_args()
+    logs.setup()
+
+    output_format = args.format
+    if output_format is None:
+        extension = os.path.splitext(args.output_path)[1].lower().lstrip(".")
+        output_format = next(
+            (name for name, (ext, _) in exporters.FORMATS.items() if extension in (name, ext)), "ndjson"
+        )
+    try:
+        exporter = exporters.get_exporter(output_format)
+    except exporters.ExportUnavailable as e:
+        sys.exit(str(e))
+
+    # Each page is written as soon as it is parsed
+    with open(args.output_path, "wb") as out:
+        for result in process_bank_statement_pdf(args.pdf_path, bank_name=args.bank, password=args.password):
+            out.write(exporter.write_page(result))
+        out.write(exporter.close())
+    print(f"✅ Wrote {output_format} to {args.output_path}")
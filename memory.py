@@ -0,0 +1,90 @@
+import ctypes
+import gc
+import logging
+import os
+import sys
+
+from config import config
+
+log = logging.getLogger(__name__)
+
+
+class MemoryLimitExceeded(MemoryError):
+    pass
+
+
+def current_rss_mb():
+    """
+    Resident set size of this process in MB, or None if it can't be read.
+    Outside Linux this falls back to the peak RSS.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KB elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def release_memory():
+    """
+    Collect garbage and hand freed heap pages back to the OS (glibc only),
+    so RSS actually drops after a page is released.
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryGuard:
+    """
+    Watches RSS across the pages of one parse: logs each page's RSS delta and
+    enforces PARSE_MAX_RSS_MB. When the cap is reached, caches are trimmed
+    first (`trim`, e.g. DocumentSession.trim); only if that is not enough is
+    MemoryLimitExceeded raised, so the parse stops with an error record
+    instead of the process being OOM-killed.
+    """
+
+    def __init__(self, max_rss_mb=None, low_memory=None, trim=None):
+        self.max_rss_mb = config.PARSE_MAX_RSS_MB if max_rss_mb is None else max_rss_mb
+        self.low_memory = config.PARSE_LOW_MEMORY if low_memory is None else low_memory
+        self.trim = trim
+        self.start = self.last = current_rss_mb()
+
+    def page_done(self, page_num):
+        if self.low_memory:
+            self._release()
+        # Reading RSS costs a /proc read per page; only when it is logged
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        log.debug("🧠 Page RSS", extra={"page": page_num, "rss_mb": round(rss, 1), "delta_mb": round(rss - self.last, 1)})
+        self.last = rss
+
+    def check(self):
+        if not self.max_rss_mb:
+            return
+        rss = current_rss_mb()
+        if rss is None or rss <= self.max_rss_mb:
+            return
+        self._release()
+        rss = current_rss_mb()
+        if rss is not None and rss > self.max_rss_mb:
+            raise MemoryLimitExceeded(
+                f"Memory limit exceeded: RSS {rss:.0f} MB > PARSE_MAX_RSS_MB={self.max_rss_mb}"
+            )
+
+    def _release(self):
+        if self.trim is not None:
+            self.trim()
+        release_memory()
@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import threading
+import uuid
+
+log = logging.getLogger(__name__)
+
+PREFIX = "statement_parser_"
+# Seconds; a page stage takes milliseconds (cache, grouping) to seconds (tables)
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=STAGE_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            # [count per bucket (not cumulative)..., count above the last, sum]
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            i = 0
+            while i < len(self.buckets) and value > self.buckets[i]:
+                i += 1
+            series[i] += 1
+            series[-1] += value
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram(
+    "stage_seconds", "Time spent in each parse stage, per page (per document for open and detect)",
+    ("bank", "stage"),
+)
+PAGES = Counter("pages_total", "Pages parsed", ("bank", "cached"))
+PAGE_TIERS = Counter("page_tiers_total", "Pages by the extraction tier that produced them", ("bank", "tier"))
+TRANSACTIONS = Counter("transactions_total", "Transactions extracted", ("bank",))
+ERRORS = Counter("errors_total", "Failed pages, and documents that could not be parsed at all", ("bank", "kind"))
+PARSES_IN_FLIGHT = Gauge("parses_in_flight", "Statements being parsed", ("endpoint",))
+STREAM_BYTES = Counter(
+    "stream_bytes_total", "Compressed response streams: bytes produced (raw) and sent (compressed)",
+    ("encoding", "stage"),
+)
+PAGES_IN_FLIGHT = Gauge("pages_in_flight", "Pages submitted to a parser pool and not yet collected")
+
+
+def observe_page(bank, result):
+    """
+    Count one records.PageResult and its stage timings.
+    """
+    if result.error is not None:
+        ERRORS.inc(bank=bank, kind="document" if result.page == 0 else "page")
+        if result.page == 0:
+            return
+    PAGES.inc(bank=bank, cached="true" if result.cached else "false")
+    if result.tier is not None:
+        PAGE_TIERS.inc(bank=bank, tier=result.tier)
+    TRANSACTIONS.inc(len(result.transactions), bank=bank)
+    for stage, seconds in (result.timings or {}).items():
+        STAGE_SECONDS.observe(seconds, bank=bank, stage=stage)
+
+
+# (pid, token) of this process; forked children get a token of their own
+_process = None
+
+
+def _process_token():
+    """
+    The name of this process's files: unique even once its PID is reused.
+    """
+    global _process
+    pid = os.getpid()
+    if _process is None or _process[0] != pid:
+        _process = (pid, f"{pid}-{uuid.uuid4().hex}")
+    return _process[1]
+
+
+def snapshot(gauges=None):
+    """
+    This process's series: only the gauges (`gauges` True), all but the
+    gauges (False) or everything (None).
+    """
+    with _lock:
+        return {
+            "pid": os.getpid(),
+            "metrics": {
+                m.name: [[list(k), v] for k, v in m.values.items()]
+                for m in REGISTRY if gauges is None or gauges == (m.kind == "gauge")
+            },
+        }
+
+
+def _write(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, path)
+
+
+def save(directory, final=False):
+    """
+    Write this process's values to `directory`, where render() in any server
+    process (gunicorn runs several) finds them. Counters and histograms go to
+    {token}.json, kept once the process exits so the totals survive it; gauges
+    to {token}.gauges.json, which the `final` save at shutdown removes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    token = _process_token()
+    gauge_path = os.path.join(directory, f"{token}.gauges.json")
+    try:
+        _write(os.path.join(directory, f"{token}.json"), snapshot(gauges=False))
+        if final:
+            os.remove(gauge_path)
+        else:
+            _write(gauge_path, snapshot(gauges=True))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log.warning("Could not save metrics: %s", e)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(snapshots):
+    """
+    Sum every process's series. Counters and histograms keep the totals of
+    processes that have exited; gauges only count live processes (a process
+    killed before its final save leaves its gauge file behind).
+    """
+    merged = {m.name: {} for m in REGISTRY}
+    kinds = {m.name: m.kind for m in REGISTRY}
+    for snap in snapshots:
+        live = _alive(snap["pid"])
+        for name, series in snap["metrics"].items():
+            if name not in merged or (kinds[name] == "gauge" and not live):
+                continue
+            for key, value in series:
+                key = tuple(key)
+                current = merged[name].get(key)
+                if current is None:
+                    merged[name][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    merged[name][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[name][key] = current + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(directory=None):
+    """
+    Prometheus text exposition of this process merged with the snapshots
+    other server processes saved in `directory`.
+    """
+    snapshots = [snapshot()]
+    if directory and os.path.isdir(directory):
+        own = _process_token() + "."
+        for name in os.listdir(directory):
+            if not name.endswith(".json") or name.startswith(own):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as fh:
+                    snapshots.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+    merged = _merge(snapshots)
+
+    out = []
+    for metric in REGISTRY:
+        out.append(f"# HELP {metric.name} {metric.documentation}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        series = merged[metric.name]
+        if metric.kind != "histogram":
+            if not series and not metric.labels:
+                series = {(): 0}
+            for key, value in sorted(series.items()):
+                out.append(f"{metric.name}{_labels(metric.labels, key)} {_number(value)}")
+            continue
+        for key, value in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                out.append(f"{metric.name}_bucket{_labels(metric.labels, key, [('le', le)])} {cumulative}")
+            out.append(f"{metric.name}_sum{_labels(metric.labels, key)} {_number(value[-1])}")
+            out.append(f"{metric.name}_count{_labels(metric.labels, key)} {cumulative}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,190 @@
+import re
+from datetime import date
+
+DEBIT = "DEBIT"
+CREDIT = "CREDIT"
+UNKNOWN = "UNKNOWN"
+
+# "4,970.54", "-500.00", "+100", "60.0(Dr)", "1309.13 Cr" once spaces and commas are gone
+AMOUNT_RE = re.compile(r"([+-]?)(\d+)(?:\.(\d{0,2}))?(?:\(?(Dr|Cr)\)?)?", re.IGNORECASE)
+
+# Day first, as on Indian statements: 16-12-2025, 05/01/25, 01 Jun 2025, 01-May-2024
+DATE_RE = re.compile(r"(\d{1,2})[-/ ]+(\d{1,2}|[A-Za-z]{3})[-/ ]+(\d{4}|\d{2})(?!\d)")
+MONTHS = {m: i for i, m in enumerate(
+    ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"], start=1
+)}
+
+
+def parse_paise(text):
+    """
+    Integer paise from a statement amount, or None if it isn't one.
+    A leading "-" or a "Dr" suffix makes it negative.
+    """
+    if not text:
+        return None
+    match = AMOUNT_RE.fullmatch("".join(text.split()).replace(",", ""))
+    if match is None:
+        return None
+    sign, rupees, fraction, drcr = match.groups()
+    paise = int(rupees) * 100 + int((fraction or "").ljust(2, "0"))
+    if sign == "-" or (drcr and drcr.upper() == "DR"):
+        paise = -paise
+    return paise
+
+
+def parse_date(text):
+    """
+    datetime.date of a statement date (anything after the date, e.g. a time, is
+    ignored), or None if it doesn't start with one.
+    """
+    if not text:
+        return None
+    match = DATE_RE.match(text.strip())
+    if match is None:
+        return None
+    day, month, year = match.groups()
+    month = int(month) if month.isdigit() else MONTHS.get(month.upper())
+    if month is None:
+        return None
+    year = int(year)
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, int(day))
+    except ValueError:
+        return None
+
+
+class Transaction:
+    """
+    One statement transaction. The text fields are exactly what the statement
+    showed (and what the API returns); amounts and the date are also parsed
+    once here: `amount_paise` is signed (negative for debits), `balance_paise`
+    negative for an overdrawn (Dr) balance, `posted_on` a datetime.date.
+    Those are None when the text couldn't be parsed.
+    """
+
+    __slots__ = ("date", "txn_id", "remarks", "amount", "balance", "type",
+                 "amount_paise", "balance_paise", "posted_on")
+
+    def __init__(self, date, txn_id, remarks, amount, balance, type, amount_paise=None, balance_paise=None):
+        self.date = date
+        self.txn_id = txn_id
+        self.remarks = remarks
+        self.amount = amount
+        self.balance = balance
+        self.type = type
+        if amount_paise is None:
+            amount_paise = parse_paise(amount)
+            if amount_paise is not None and type in (DEBIT, CREDIT):
+                amount_paise = -abs(amount_paise) if type == DEBIT else abs(amount_paise)
+        self.amount_paise = amount_paise
+        self.balance_paise = parse_paise(balance) if balance_paise is None else balance_paise
+        self.posted_on = parse_date(date)
+
+    def to_dict(self):
+        """
+        The API / JSON shape.
+        """
+        return {
+            "date": self.date,
+            "txnId": self.txn_id,
+            "remarks": self.remarks,
+            "amount": self.amount,
+            "balance": self.balance,
+            "type": self.type,
+        }
+
+    def to_row(self):
+        """
+        Every field as a JSON-safe list (for caches); see from_row.
+        """
+        return [self.date, self.txn_id, self.remarks, self.amount, self.balance, self.type,
+                self.amount_paise, self.balance_paise]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def __reduce__(self):
+        # Pickled (to and from process workers) without re-parsing amounts
+        return Transaction.from_row, (self.to_row(),)
+
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return self.to_row() == other.to_row()
+
+    def __repr__(self):
+        return f"Transaction({self.date!r}, {self.txn_id!r}, {self.amount!r}, {self.type})"
+
+
+class PageResult:
+    """
+    What parsing one page produced: its transactions, or the error that stopped
+    it. `page` 0 means the document as a whole (it couldn't be opened, the bank
+    couldn't be detected). Converted to JSON only at the edge, with to_dict().
+    `timings` maps parse stages to the seconds they took (see main._extract_page and main._DocumentGrouper).
+    `tier` is the extraction that produced the page: "words", "template" or
+    "tables" (see main._extract_tiered).
+    """
+
+    __slots__ = ("page", "transactions", "error", "cached", "timings", "tier")
+
+    def __init__(self, page, transactions=(), error=None, cached=False, timings=None, tier=None):
+        self.page = page
+        self.transactions = list(transactions)
+        self.error = error
+        self.cached = cached
+        self.timings = timings
+        self.tier = tier
+
+    def to_dict(self, timings=False):
+        """
+        The page_data record; with `timings`, also the stage timings in milliseconds.
+        """
+        if self.error is not None:
+            result = {
+                "page": self.page,
+                "error": self.error,
+                "transactions": [t.to_dict() for t in self.transactions],
+            }
+        else:
+            result = {
+                "page": self.page,
+                "transactions": [t.to_dict() for t in self.transactions],
+            }
+            if self.cached:
+                result["cached"] = True
+            if self.tier is not None:
+                result["tier"] = self.tier
+        if timings and self.timings:
+            result["timings"] = {stage: round(seconds * 1000, 3) for stage, seconds in self.timings.items()}
+        return result
+
+    def __reduce__(self):
+        return PageResult, (self.page, self.transactions, self.error, self.cached, self.timings, self.tier)
+
+    def __repr__(self):
+        status = f"error={self.error!r}" if self.error is not None else f"{len(self.transactions)} transactions"
+        return f"PageResult(page={self.page}, {status})"
+
+
+class DocumentInfo:
+    """
+    What opening one document of a batch settled, yielded by main.process_batch
+    before its pages: the bank it is parsed with (detected when asked for
+    "AUTO"), its page count and the seconds the "open" / "detect" stages took.
+    `error` is set when it can't be parsed (the page 0 record that follows).
+    """
+
+    __slots__ = ("bank_name", "page_count", "timings", "error")
+
+    def __init__(self, bank_name, page_count=0, timings=None, error=None):
+        self.bank_name = bank_name
+        self.page_count = page_count
+        self.timings = timings if timings is not None else {}
+        self.error = error
+
+    def __repr__(self):
+        return f"DocumentInfo(bank_name={self.bank_name!r}, page_count={self.page_count})"
@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+
+from config import config
+
+log = logging.getLogger(__name__)
+
+
+def cache_key(pdf_sha256, bank_name, parser_version, password=None):
+    """
+    Key a parse by its exact input: PDF bytes, parser and version.
+    The password is part of the key so a cached decryption is never
+    replayed to a request that did not supply the same password.
+    """
+    h = hashlib.sha256()
+    for part in (pdf_sha256, bank_name, parser_version, password or ""):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResultCacheWriter:
+    """
+    Collects the NDJSON lines of one parse into a temp file and publishes
+    them atomically on commit(), so readers never see a partial entry.
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.tmp_path = os.path.join(cache.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+        self.fh = gzip.open(self.tmp_path, "wb", compresslevel=cache.compresslevel)
+
+    def write(self, line):
+        self.fh.write(line.encode("utf-8") if isinstance(line, str) else line)
+
+    def commit(self):
+        self.fh.close()
+        os.replace(self.tmp_path, self.cache.path_for(self.key))
+        self.cache.evict()
+
+    def abort(self):
+        self.fh.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ResultCache:
+    """
+    Content-addressed cache of finished parses in RESULTS_DIR.
+    Each entry is the gzip-compressed NDJSON stream of one statement (one
+    line per page). Entries expire after `max_age` seconds without a hit and
+    the least recently used ones are evicted once `max_bytes` is exceeded.
+    Pages are stored together rather than one entry each: a page's line holds
+    the transactions that closed on it, which depend on the pages before it
+    (see main._DocumentGrouper), so no page line can be replayed on its own,
+    and an entry is only published once every page parsed. Pages are reused
+    one at a time, across files, by PageCache.
+    """
+
+    suffix = ".ndjson.gz"
+
+    def __init__(self, directory, max_bytes=None, max_age=None, compresslevel=6):
+        self.directory = directory
+        self.max_bytes = config.RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age = config.RESULT_CACHE_MAX_AGE if max_age is None else max_age
+        self.compresslevel = compresslevel
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def lookup(self, key):
+        """
+        Return the cached NDJSON lines (bytes) for `key`, or None on a miss.
+        A hit refreshes the entry's position in the LRU order.
+        """
+        path = self.path_for(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return None
+            with gzip.open(path, "rb") as fh:
+                lines = fh.readlines()
+            os.utime(path)
+            return lines
+        except (OSError, EOFError):
+            return None
+
+    def writer(self, key):
+        return ResultCacheWriter(self, key)
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently used until under max_bytes.
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # Temp files of writers that died mid-parse
+            if name.endswith(".tmp"):
+                if now - stat.st_mtime > config.UPLOAD_STALE_SECONDS:
+                    self._remove(path)
+                continue
+            if not name.endswith(self.suffix):
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PageCache(ResultCache):
+    """
+    Extracted tables of single pages keyed on fingerprint.page_fingerprint,
+    so pages repeated across different files (cumulative statements) are extracted
+    once. Tables, not transactions: grouping depends on the pages before it.
+    Stored with the extraction tier that produced them.
+    Same expiry/LRU policy as ResultCache. put() may run in a pool worker on a
+    pickled copy of the cache, so writes are counted by the process consuming
+    the pages (see written()).
+    """
+
+    suffix = ".json.gz"
+    EVICT_EVERY = 64
+
+    def __init__(self, directory, max_bytes=None, max_age=None, compresslevel=6):
+        super().__init__(directory, max_bytes, max_age, compresslevel)
+        self._writes = 0
+
+    def get(self, fingerprint):
+        lines = self.lookup(fingerprint)
+        if lines is None:
+            return None
+        try:
+            record = json.loads(b"".join(lines))
+            return record["tables"], record["tier"]
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    def put(self, fingerprint, tables, tier):
+        tmp_path = os.path.join(self.directory, f".{fingerprint}.{uuid.uuid4().hex}.tmp")
+        try:
+            with gzip.open(tmp_path, "wb", compresslevel=self.compresslevel) as fh:
+                fh.write(json.dumps({"tables": tables, "tier": tier}).encode("utf-8"))
+            os.replace(tmp_path, self.path_for(fingerprint))
+        except OSError as e:
+            log.warning("Error writing page cache: %s", e)
+            self._remove(tmp_path)
+
+    def written(self):
+        """
+        Count one page extracted (and put) anywhere; evicts every EVICT_EVERY pages.
+        """
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
@@ -0,0 +1,140 @@
+import re
+
+# Row kinds returned by RowClassifier.classify
+SKIP = "skip"
+EMPTY = "empty"
+HEADER = "header"
+START = "start"
+FOOTER = "footer"
+CONTINUATION = "continuation"
+
+# Cells are joined with this (never present in extracted text) so one regex
+# sees the whole row while per-cell rules can still anchor on cell boundaries
+SEP = "\x1f"
+# Row text views a header/footer rule can match against
+VIEWS = ("text", "upper", "lower")
+
+
+def any_of(keywords):
+    """
+    Pattern matching any of the literal keywords.
+    """
+    return "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+
+
+def all_of(keywords):
+    """
+    Pattern matching (at the start of the text) when every keyword occurs
+    somewhere in it, in any order and possibly overlapping.
+    """
+    return "^" + "".join(f"(?=.*?{re.escape(k)})" for k in keywords)
+
+
+def first_of(patterns):
+    """
+    Compiled pattern equivalent to trying `patterns` with re.search one by one
+    and keeping the first that matches. Each pattern has one capture group;
+    use first_group(compiled, text) to read it.
+    """
+    return re.compile("|".join(f".*?(?:{p})" for p in patterns), re.DOTALL)
+
+
+def first_group(compiled, text):
+    match = compiled.match(text)
+    return match.group(match.lastindex) if match else None
+
+
+def strip_cells(row):
+    return [(c or "").strip() for c in row]
+
+
+def collapse_cells(row):
+    # Multiline cell text on a single line
+    return [" ".join(str(c or "").split()) for c in row]
+
+
+class RowClassifier:
+    """
+    One bank's row rules, compiled once: header, footer and transaction-start
+    (date) tests are each a single regex. classify() normalizes the cells once,
+    joins them into the row text every rule runs on and returns (kind, cells),
+    where cells is the normalized row (the original row when `normalize` is None).
+
+    Rules see the stripped cells joined by SEP, as "text" or case-folded as
+    "upper" / "lower"; `header` and `footer` are (view, pattern) pairs matched
+    with re.search. `date` is searched in (or with `date_fullmatch`, must fill)
+    the stripped cell at `date_col`, unless `exclude` also occurs in that cell.
+    `date_fix` is a (pattern, replacement) applied to the `fix_cols` cells
+    before the date test (e.g. to rejoin a date split across lines).
+    `normalize` must return stripped strings.
+    """
+
+    def __init__(self, date, date_col=0, date_fullmatch=False, normalize=None, min_cells=0, pad_to=0,
+                 skip_empty=False, header=None, footer=None, exclude=None, date_fix=None, fix_cols=()):
+        self.date = re.compile(date)
+        self.date_test = self.date.fullmatch if date_fullmatch else self.date.search
+        self.date_col = date_col
+        self.normalize = normalize
+        self.min_cells = min_cells
+        self.pad_to = pad_to
+        self.skip_empty = skip_empty
+        self.header = self._rule(header)
+        self.footer = self._rule(footer)
+        self.exclude = re.compile(exclude) if exclude else None
+        self.date_fix = (re.compile(date_fix[0]), date_fix[1]) if date_fix else None
+        self.fix_cols = tuple(fix_cols)
+        rules = [rule for rule in (self.header, self.footer) if rule is not None]
+        self.use_upper = any(view == 1 for view, _ in rules)
+        self.use_lower = any(view == 2 for view, _ in rules)
+
+    @staticmethod
+    def _rule(rule):
+        if rule is None:
+            return None
+        view, pattern = rule
+        if view not in VIEWS:
+            raise ValueError(f"Unknown row view: {view}")
+        return VIEWS.index(view), re.compile(pattern, re.DOTALL).search
+
+    def classify(self, row, date_col=None):
+        """
+        (kind, cells) for one table row. `date_col` overrides the configured
+        date column for layouts that find it from the header row.
+        """
+        if self.normalize is not None:
+            cells = self.normalize(row)
+            if len(cells) < self.min_cells:
+                return SKIP, cells
+            if len(cells) < self.pad_to:
+                cells += [""] * (self.pad_to - len(cells))
+            if self.skip_empty and not any(cells):
+                return EMPTY, cells
+            text = SEP.join(cells)
+        else:
+            cells = row
+            if len(cells) < self.min_cells:
+                return SKIP, cells
+            stripped = [str(c).strip() for c in cells]
+            if self.skip_empty and not any(stripped):
+                return EMPTY, cells
+            text = SEP.join(stripped)
+        # Case-folded once per row, and only the views some rule uses
+        views = (text, text.upper() if self.use_upper else None, text.lower() if self.use_lower else None)
+
+        if self.header is not None and self.header[1](views[self.header[0]]):
+            return HEADER, cells
+
+        if self.date_fix is not None:
+            pattern, repl = self.date_fix
+            for col in self.fix_cols:
+                if cells[col]:
+                    cells[col] = pattern.sub(repl, cells[col])
+
+        if len(cells) >= 2:
+            value = str(cells[self.date_col if date_col is None else date_col]).strip()
+            if value and self.date_test(value) and not (self.exclude and self.exclude.search(value)):
+                return START, cells
+
+        if self.footer is not None and self.footer[1](views[self.footer[0]]):
+            return FOOTER, cells
+        return CONTINUATION, cells
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+from config import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps_json(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj):
+    """
+    Compact UTF-8 JSON bytes. Uses orjson when it is installed; the stdlib
+    fallback produces the same bytes.
+    """
+    try:
+        if orjson is not None:
+            return orjson.dumps(obj)
+        return _dumps_json(obj)
+    except (TypeError, UnicodeEncodeError):
+        # Lone surrogates from a broken PDF text layer: escape them instead
+        return json.dumps(obj, separators=(",", ":")).encode("ascii")
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def line(obj):
+    """
+    One NDJSON line (bytes, with its newline).
+    """
+    return dumps(obj) + b"\n"
+
+
+def page_line(page_result, file_id=None, timings=False):
+    """
+    The page_data NDJSON line of a records.PageResult.
+    """
+    record = page_result.to_dict(timings)
+    record["type"] = "page_data"
+    if file_id is not None:
+        record["file_id"] = file_id
+    return line(record)
+
+
+async def coalesce(chunks, chunk_bytes=None, flush_interval=None):
+    """
+    Regroup an async stream of byte chunks (NDJSON lines, CSV pages, ...) into
+    writes of about `chunk_bytes`, so a run of small or cached pages goes out
+    in one write instead of one each. Buffered data is never held longer than
+    `flush_interval` seconds, so a slow page doesn't delay those before it.
+    A `chunk_bytes` of 0 passes chunks through unchanged.
+    """
+    chunk_bytes = config.STREAM_CHUNK_BYTES if chunk_bytes is None else chunk_bytes
+    flush_interval = config.STREAM_FLUSH_INTERVAL if flush_interval is None else flush_interval
+    if chunk_bytes <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    buffer = []
+    size = 0
+    deadline = None
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+            if not done:
+                # The next chunk is taking a while: send what is waiting
+                yield b"".join(buffer)
+                buffer, size = [], 0
+                continue
+
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                break
+            if not chunk:
+                continue
+            if not buffer:
+                deadline = loop.time() + flush_interval
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= chunk_bytes:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b"".join(buffer)
+    finally:
+        # Client went away mid-stream: stop the source so its cleanup runs
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await iterator.aclose()
@@ -0,0 +1,52 @@
+"""
+Rows at the top of a page, before its first transaction row: only wrapped
+lines of the transaction left open on the page before continue it.
+"""
+from hdfcBank.grouping_logic import TransactionGrouper as HdfcGrouper
+from kotakBank.grouping_logic import TransactionGrouper as KotakGrouper
+
+
+def feed_pages(grouper, pages):
+    grouped = []
+    for rows in pages:
+        grouper.start_page()
+        grouped.extend(grouper.feed(rows))
+    grouped.extend(grouper.close())
+    return grouped
+
+
+def test_hdfc_page_top_keeps_wrapped_lines_only():
+    header = ["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"]
+    pages = [
+        [header, ["01/01/25", "UPI 123 PAYMENT TO", "0000123", "01/01/25", "10.00", "", "90.00"]],
+        [
+            ["", "HDFC BANK LIMITED Statement of Account", "", "", "", "", ""],
+            ["", "", "", "", "", "", "Page No .: 2"],
+            header,
+            ["", "SHIVAMCLINIC", "456", "", "", "", ""],
+            ["02/01/25", "RENT", "0000789", "02/01/25", "", "5.00", "95.00"],
+            ["", "TRANSFER", "", "", "", "", ""],
+        ],
+    ]
+    assert feed_pages(HdfcGrouper(), pages) == [
+        ["01/01/25", "UPI 123 PAYMENT TO SHIVAMCLINIC", "0000123456", "-10.00", "90.00"],
+        ["02/01/25", "RENT TRANSFER", "0000789", "+5.00", "95.00"],
+    ]
+
+
+def test_kotak_page_top_drops_banner_and_brought_forward():
+    header = ["#", "TRANSACTION DATE", "VALUE DATE", "TRANSACTION DETAILS", "CHQ / REF NO.",
+              "DEBIT/CREDIT(Rs)", "BALANCE(Rs)"]
+    pages = [
+        [header, ["1", "01 Jan 2025", "01-01-2025", "UPI/123/PAYMENT/TO/", "UPI-123", "-10.00", "90.00"]],
+        [
+            ["KOT", "AK MAHINDRA", "BANK - Acc", "ount Statement", "", "", ""],
+            ["", "", "", "Balance brought forward", "", "", "90.00"],
+            ["", "11:20 AM", "", "SHIVAMCLINIC", "", "", ""],
+            ["2", "02 Jan 2025", "02-01-2025", "RENT", "UPI-789", "+5.00", "95.00"],
+        ],
+    ]
+    assert feed_pages(KotakGrouper(), pages) == [
+        ["01 Jan 2025 11:20 AM", "UPI/123/PAYMENT/TO/SHIVAMCLINIC", "UPI-123", "-10.00", "90.00"],
+        ["02 Jan 2025", "RENT", "UPI-789", "+5.00", "95.00"],
+    ]
@@ -0,0 +1,44 @@
+"""
+A job taken over as stale is only ever written by its new runner.
+"""
+import io
+
+import jobs
+from uploads import IngestedUpload
+
+
+def queue_job(store):
+    data = b"%PDF-1.4 not parsed here"
+    return store.create(IngestedUpload(io.BytesIO(data), len(data), sha256="0" * 64), "a.pdf", "HDFC BANK")
+
+
+def test_stale_owner_cannot_write(tmp_path):
+    store = jobs.JobStore(str(tmp_path), stale_after=0)
+    job_id = queue_job(store)
+    first = store.claim()
+    # Never refreshed within stale_after: a second runner takes it over
+    second = store.claim()
+    assert first["id"] == second["id"] == job_id
+    assert first["owner"] != second["owner"]
+
+    assert not store.heartbeat(job_id, first["owner"])
+    assert not store.progress(job_id, first["owner"], 1)
+    with open(store.path(job_id, "part"), "wb") as fh:
+        fh.write(b'{"type": "metadata"}\n')
+    assert not store.finish(job_id, first["owner"], jobs.FAILED, "stale")
+    assert store.get(job_id)["status"] == jobs.RUNNING
+
+    assert store.heartbeat(job_id, second["owner"])
+    assert store.progress(job_id, second["owner"], 1)
+    assert store.finish(job_id, second["owner"], jobs.DONE)
+    job = store.get(job_id)
+    assert (job["status"], job["pages_done"]) == (jobs.DONE, 1)
+    assert store.read_result(job_id) == [b'{"type": "metadata"}\n']
+
+
+def test_heartbeat_keeps_job_from_going_stale(tmp_path):
+    store = jobs.JobStore(str(tmp_path), stale_after=60)
+    queue_job(store)
+    job = store.claim()
+    assert store.heartbeat(job["id"], job["owner"])
+    assert store.claim() is None
@@ -0,0 +1,87 @@
+"""
+Every bank's synthetic statement (benchmarks/synthetic_statements.py) parses
+back to the transactions it was generated from, in every executor mode.
+"""
+import pytest
+
+from main import EXECUTOR_MODES, process_bank_statement_pdf
+from synthetic_statements import LAYOUTS, build_statement, expected_transactions
+
+PAGES = 2
+# Few enough rows to keep the suite quick
+PER_PAGE = 12
+
+
+def parse(path, bank_name, executor):
+    results = list(process_bank_statement_pdf(path, bank_name=bank_name, executor=executor, max_workers=2))
+    errors = [(r.page, r.error) for r in results if r.error is not None]
+    rows = [(t.date, t.txn_id, t.remarks, t.amount_paise, t.balance_paise) for r in results for t in r.transactions]
+    return [r.page for r in results], errors, rows
+
+
+@pytest.fixture(scope="module")
+def statements(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("statements")
+    paths = {}
+    for bank_name in LAYOUTS:
+        paths[bank_name] = str(directory / (bank_name.replace(" ", "_") + ".pdf"))
+        build_statement(bank_name, PAGES, paths[bank_name], per_page=PER_PAGE)
+    return paths
+
+
+@pytest.mark.parametrize("executor", EXECUTOR_MODES)
+@pytest.mark.parametrize("bank_name", list(LAYOUTS))
+def test_matches_generated_transactions(statements, bank_name, executor):
+    pages, errors, rows = parse(statements[bank_name], bank_name, executor)
+    assert errors == []
+    assert pages == list(range(1, PAGES + 1))
+    assert rows == expected_transactions(bank_name, PAGES, per_page=PER_PAGE)
+
+
+@pytest.mark.parametrize("executor", EXECUTOR_MODES)
+def test_detects_bank(statements, executor):
+    _, errors, rows = parse(statements["HDFC BANK"], "AUTO", executor)
+    assert errors == []
+    assert rows == expected_transactions("HDFC BANK", PAGES, per_page=PER_PAGE)
+
+
+@pytest.mark.parametrize("executor", EXECUTOR_MODES)
+@pytest.mark.parametrize("count", [PAGES - 1, PAGES + 1])
+def test_page_tree_wins_over_count(tmp_path, executor, count):
+    """
+    A wrong /Count in the page tree root changes neither the pages parsed nor
+    the last transaction.
+    """
+    bank_name = "KOTAK MAHINDRA BANK"
+    path = tmp_path / "statement.pdf"
+    build_statement(bank_name, PAGES, str(path), per_page=PER_PAGE)
+    data = path.read_bytes()
+    assert data.count(f"/Count {PAGES}".encode()) == 1
+    path.write_bytes(data.replace(f"/Count {PAGES}".encode(), f"/Count {count}".encode()))
+
+    pages, errors, rows = parse(str(path), bank_name, executor)
+    assert errors == []
+    assert pages == list(range(1, PAGES + 1))
+    assert rows == expected_transactions(bank_name, PAGES, per_page=PER_PAGE)
+
+
+@pytest.mark.parametrize("executor", EXECUTOR_MODES)
+def test_transaction_split_across_pages(tmp_path, executor):
+    """
+    A transaction whose wrapped line is at the top of the next page, under that
+    page's banner and header, comes back whole and without the banner, with
+    the next page.
+    """
+    bank_name = "KOTAK MAHINDRA BANK"
+    path = str(tmp_path / "statement.pdf")
+    build_statement(bank_name, PAGES, path, per_page=PER_PAGE, split_last=True)
+    expected = expected_transactions(bank_name, PAGES, per_page=PER_PAGE)
+    split = expected[PER_PAGE - 1]
+
+    results = list(process_bank_statement_pdf(path, bank_name=bank_name, executor=executor, max_workers=2))
+    assert [r.error for r in results] == [None] * PAGES
+    by_page = {r.page: [(t.date, t.txn_id, t.remarks, t.amount_paise, t.balance_paise) for t in r.transactions]
+               for r in results}
+    assert split not in by_page[1]
+    assert by_page[2][0] == split
+    assert by_page[1] + by_page[2] == expected
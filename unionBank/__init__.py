@@ -0,0 +1,7 @@
+# Header/name patterns used by bank_detection to recognise this layout from page 1
+SIGNATURES = [
+    r"(?i)\bUnion\s+Bank\b",
+    r"\bTransaction\s+Id\b",
+    r"\bRemarks\b",
+    r"\d\.\d{1,2}\s*\((?:Dr|Cr)\)",
+]
@@ -1,148 +1,82 @@
-import json
-import re
+from grouping import Grouper
+from row_classifier import RowClassifier, HEADER, START, all_of, any_of
 
-def is_date(text):
-    return bool(
-        text and re.search(r'\d{1,2}-\d{1,2}-\d{4}', text)
-    )
+ROWS = RowClassifier(
+    # Dates as 16-12-2025 or 16/12/2025
+    r'\d{1,2}[-/]\d{1,2}[-/]\d{4}',
+    # Column header row: every required keyword somewhere in the row
+    header=("upper", all_of(["DATE", "TRANSACTION", "REMARKS", "AMOUNT", "BALANCE"])),
+    # Metadata rows that might contain a date but are not transactions
+    exclude=any_of(["Statement Date", "Statement Period", "Account Number", "Customer", "Branch"]),
+)
 
-def is_time(text):
-    return bool(
-        text and re.search(r'\d{1,2}:\d{2}\s*(AM|PM)', text)
-    )
 
-def is_transaction_start(row,dateIndex):
+class TransactionGrouper(Grouper):
     """
-    Transaction starts ONLY when a DATE is found in row[1].
+    Union Bank rows into [date, remarks, ref, amount, balance] transactions:
+    one per row with a date in the date column, read through the columns of the
+    latest header row (later pages without one keep using it).
     """
-    if len(row) < 2:
-        return False
 
-    col1 = str(row[dateIndex]).strip().replace('/', '-')
-    
-    # Exclude metadata rows that might contain a date but are not transactions
-    if any(keyword in col1 for keyword in ["Statement Date", "Statement Period", "Account Number", "Customer", "Branch"]):
-        return False
-        
-    return is_date(col1)
+    def __init__(self):
+        self.dateIndex = 0
+        self.transactionIdIndex = 0
+        self.remarksIndex = 0
+        self.amountIndex = 0
+        self.balanceIndex = 0
 
+    def feed(self, rows):
+        for row in rows:
+            if not row:
+                continue
+            kind, row = ROWS.classify(row, self.dateIndex)
+
+            if kind == HEADER:
+                self._read_header(row)
+                continue
+            # Heuristic: New Transaction starts with a date in the date column.
+            # Nothing else joins it, so it is complete right away.
+            if kind == START:
+                yield self._merge(row)
+
+    def _read_header(self, row):
+        for idx, val in enumerate(row):
+            val_upper = str(val).upper().strip()
+            if "DATE" in val_upper:
+                self.dateIndex = idx
+            elif "TRANSACTION" in val_upper and "ID" in val_upper:
+                # Ensure it matches "Transaction Id" or similar, not just "Transaction"
+                self.transactionIdIndex = idx
+            elif "REMARKS" in val_upper:
+                self.remarksIndex = idx
+            elif "AMOUNT" in val_upper:
+                self.amountIndex = idx
+            elif "BALANCE" in val_upper:
+                self.balanceIndex = idx
+
+    def _merge(self, row):
+        # Ensure row has enough columns (pad if necessary, though usually extract_tables does it)
+        # We need up to index 8
+        while len(row) < 9:
+            row.append("")
+
+        date = str(row[self.dateIndex]).strip() if row[self.dateIndex] else ""
+        # Ref and remarks may be split over several cells: joined without separator
+        ref = "".join(str(row[i]).strip() for i in range(self.transactionIdIndex, self.remarksIndex)
+                      if i < len(row) and row[i])
+        desc = "".join(str(row[i]).strip() for i in range(self.remarksIndex, self.amountIndex)
+                       if i < len(row) and row[i])
+        amount = str(row[self.amountIndex]).strip() if row[self.amountIndex] else ""
+        balance = str(row[self.balanceIndex]).strip() if row[self.balanceIndex] else ""
+        return [date, desc, ref, amount, balance]
 
-def group_transactions(pages,page_number):
+
+def group_transactions(pages, page_number=None):
     """
-    Groups raw table rows into grouped transaction blocks.
+    Groups raw table rows into merged transactions, pages taken on their own.
     Args:
         pages (list): A list of pages, where each page is a list of rows, and each row is a list of cell strings.
     Returns:
-        list: A list of transactions, where each transaction is a list of rows that belong to it.
+        list: A list of [date, remarks, ref, amount, balance] rows, one per transaction.
     """
-    transactions = []
-    current_transaction = []
-    
-    dateIndex=0
-    transactionIdIndex=0
-    remarksIndex=0
-    amountIndex=0
-    balanceIndex=0
-    
-    for page in pages:
-        for row in page:
-            if not row:
-                continue
-            # Check if all required keywords are present in the row
-            row_str_upper = [str(c).upper().strip() for c in row]
-            row_joined = " ".join(row_str_upper)
-            
-            required_keywords = ["DATE", "TRANSACTION", "REMARKS", "AMOUNT", "BALANCE"]
-            
-            if all(keyword in row_joined for keyword in required_keywords):
-                for idx, val in enumerate(row):
-                    val_upper = str(val).upper().strip()
-                    if "DATE" in val_upper:
-                        dateIndex = idx
-                    elif "TRANSACTION" in val_upper and "ID" in val_upper:
-                         # Ensure it matches "Transaction Id" or similar, not just "Transaction"
-                        transactionIdIndex = idx
-                    elif "REMARKS" in val_upper:
-                        remarksIndex = idx
-                    elif "AMOUNT" in val_upper:
-                        amountIndex = idx
-                    elif "BALANCE" in val_upper:
-                        balanceIndex = idx
-                continue
-            # Heuristic: New Transaction starts with a date in the first column
-            if is_transaction_start(row,dateIndex):
-                # If we were building a transaction, save it
-                if current_transaction:
-                    transactions.append(current_transaction)
-                
-                # Start new transaction
-                current_transaction = [row]
-            
-    # Append the final transaction if exists
-    if current_transaction:
-        transactions.append(current_transaction)
-    # with open(f"page_{page_number}_raw2.json", "w") as f:
-    #             json.dump(transactions, f, indent=4)
-    # Validation and Processing to merge rows
-    merged_transactions = []
-    for txn_rows in transactions:
-        if not txn_rows:
-            continue
-            
-        # Initialize fields
-        merged_date = []
-        merged_desc = []
-        merged_ref = []
-        merged_amt = []
-        merged_bal = []
-        
-        for row in txn_rows:
-            # Ensure row has enough columns (pad if necessary, though usually extract_tables does it)
-            # We need up to index 8
-            while len(row) < 9:
-                row.append("")
-
-            if row[dateIndex] and str(row[dateIndex]).strip():
-                merged_date.append(str(row[dateIndex]).strip())
-
-            ref_combined = "".join(str(row[i]).strip() for i in range(transactionIdIndex, remarksIndex) if i < len(row) and row[i])
-            if ref_combined:
-                merged_ref.append(ref_combined)
-            
-            desc_combined = "".join(str(row[i]).strip() for i in range(remarksIndex, amountIndex) if i < len(row) and row[i])
-            if desc_combined:
-                merged_desc.append(desc_combined)
-                
-            if row[amountIndex] and str(row[amountIndex]).strip():
-                merged_amt.append(str(row[amountIndex]).strip())
-                
-            if row[balanceIndex] and str(row[balanceIndex]).strip():
-                merged_bal.append(str(row[balanceIndex]).strip())
-        
-        # Join strategies
-        # Date: Space joined (e.g., "01 Jun 2025 11:20 AM")
-        final_date = " ".join(merged_date)
-        
-        # Description: Joined without separator based on "Payment from" example reconstruction
-        # User example: "UPI/SHIVAMCLINIC..."
-        final_desc = "".join(merged_desc)
-        
-        # Ref: Joined without separator (usually single line, but simple concatenation is safest for split IDs)
-        final_ref = "".join(merged_ref)
-        
-        # Amount: Joined without separator
-        final_amt = "".join(merged_amt)
-        
-        # Balance: Joined without separator
-        final_bal = "".join(merged_bal)
-        
-        # Create single row for this transaction
-        merged_transactions.append([
-            final_date,
-            final_desc,
-            final_ref,
-            final_amt,
-            final_bal
-        ])
-        
-    return merged_transactions
+    return TransactionGrouper().group(pages)
@@ -1,6 +1,9 @@
+from records import Transaction, parse_paise
+
+
 def generate_structured_output(grouped_transactions):
     """
-    Converts a list of grouped transaction arrays into a list of structured dictionaries.
+    Converts a list of grouped transaction arrays into a list of records.Transaction objects.
     
     Args:
         grouped_transactions (list): List of list of strings, e.g.,
@@ -16,7 +19,7 @@ def generate_structured_output(grouped_transactions):
         ]
         
     Returns:
-        list: List of dictionaries with keys: date, txnId, remarks, amount, balance, type.
+        list: List of Transaction (to_dict() keys: date, txnId, remarks, amount, balance, type).
     """
     structured_data = []
     
@@ -44,13 +47,10 @@ def generate_structured_output(grouped_transactions):
             txn_type = "UNKNOWN"
         
 
-        structured_data.append({
-            "date": txn_date,
-            "txnId": txn_id,
-            "remarks": remarks,
-            "amount": amount_str.replace("-", "").replace("+", ""),
-            "balance": balance,
-            "type": txn_type
-        })
+        structured_data.append(Transaction(
+            txn_date, txn_id, remarks, amount_str.replace("-", "").replace("+", ""), balance, txn_type,
+            # Keep the sign of an overdrawn "(Dr)" balance
+            balance_paise=parse_paise(row[4]),
+        ))
         
     return structured_data
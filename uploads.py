@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import time
+import uuid
+import zipfile
+
+from config import config
+
+log = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_PREFIX = "upload_"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class IngestedUpload:
+    """
+    An uploaded PDF ready for parsing: `source` is an in-memory BytesIO for
+    small files and a path inside UPLOAD_TMP_DIR for everything else.
+    `sha256` is the hex digest of the bytes, computed while they were read.
+    """
+
+    def __init__(self, source, size, path=None, sha256=None):
+        self.source = source
+        self.size = size
+        self.path = path
+        self.sha256 = sha256
+
+    def cleanup(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+                log.debug("🗑️ Cleaned up temp file: %s", self.path)
+            except Exception as cleanup_err:
+                log.warning("Error cleaning up: %s", cleanup_err)
+        self.source = None
+
+
+def ensure_tmp_dir():
+    os.makedirs(config.UPLOAD_TMP_DIR, exist_ok=True)
+    return config.UPLOAD_TMP_DIR
+
+
+def sweep_stale_uploads(max_age=None):
+    """
+    Remove uploads left behind by a crashed worker. Only files older than
+    `max_age` seconds are touched, so parses in other workers are safe.
+    """
+    max_age = config.UPLOAD_STALE_SECONDS if max_age is None else max_age
+    tmp_dir = ensure_tmp_dir()
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in os.listdir(tmp_dir):
+        path = os.path.join(tmp_dir, name)
+        if not name.startswith(UPLOAD_PREFIX):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        log.info("🗑️ Removed %s stale upload(s) from %s", removed, tmp_dir)
+    return removed
+
+
+def _check_size(size, max_bytes):
+    if max_bytes and size > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+
+
+class _UploadSpool:
+    """
+    Collects one upload's chunks, hashing them as they arrive: in memory up to
+    `memory_threshold` bytes, then in a uniquely named file in UPLOAD_TMP_DIR
+    (point it at /dev/shm for tmpfs). Raises UploadTooLarge as soon as
+    `max_bytes`, or the batch's `max_total_bytes` with `used_bytes` already
+    taken by earlier files, is exceeded. Call discard() if anything fails.
+    """
+
+    def __init__(self, max_bytes, memory_threshold, max_total_bytes=None, used_bytes=0):
+        self.max_bytes = max_bytes
+        self.memory_threshold = memory_threshold
+        self.max_total_bytes = max_total_bytes
+        self.used_bytes = used_bytes
+        self.buffer = io.BytesIO()
+        self.digest = hashlib.sha256()
+        self.spill = None
+        self.path = None
+        self.size = 0
+
+    def accept(self, chunk):
+        """
+        Count and hash `chunk` ahead of write(); True when writing it goes to disk.
+        """
+        self.size += len(chunk)
+        _check_size(self.size, self.max_bytes)
+        if self.max_total_bytes and self.used_bytes + self.size > self.max_total_bytes:
+            raise UploadTooLarge(f"Batch exceeds the {self.max_total_bytes} byte limit")
+        self.digest.update(chunk)
+        return self.spill is not None or self.size > self.memory_threshold
+
+    def write(self, chunk):
+        if self.spill is None and self.size > self.memory_threshold:
+            self.path = os.path.join(ensure_tmp_dir(), f"{UPLOAD_PREFIX}{uuid.uuid4().hex}.pdf")
+            self.spill = open(self.path, "wb")
+            self.spill.write(self.buffer.getvalue())
+            self.buffer = None
+        if self.spill is not None:
+            self.spill.write(chunk)
+        else:
+            self.buffer.write(chunk)
+
+    def finish(self):
+        if self.spill is not None:
+            self.spill.close()
+            return IngestedUpload(self.path, self.size, path=self.path, sha256=self.digest.hexdigest())
+        self.buffer.seek(0)
+        return IngestedUpload(self.buffer, self.size, sha256=self.digest.hexdigest())
+
+    def discard(self):
+        if self.spill is not None:
+            self.spill.close()
+        IngestedUpload(None, self.size, self.path).cleanup()
+
+
+async def ingest_upload(file, max_bytes=None, memory_threshold=None):
+    """
+    Read an UploadFile in chunks without blocking the event loop (see _UploadSpool).
+    Raises UploadTooLarge as soon as `max_bytes` is exceeded.
+    """
+    max_bytes = config.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    memory_threshold = config.UPLOAD_MEMORY_THRESHOLD if memory_threshold is None else memory_threshold
+
+    # Starlette already knows the size of the spooled part, reject before copying anything
+    if file.size is not None:
+        _check_size(file.size, max_bytes)
+
+    spool = _UploadSpool(max_bytes, memory_threshold)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if spool.accept(chunk):
+                await asyncio.to_thread(spool.write, chunk)
+            else:
+                spool.write(chunk)
+        if spool.spill is not None:
+            return await asyncio.to_thread(spool.finish)
+        return spool.finish()
+    except BaseException:
+        spool.discard()
+        raise
+
+
+def is_zip(upload):
+    """
+    Zip archives are recognised by their magic bytes, not the filename.
+    """
+    source = upload.source
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()[:4] == b"PK\x03\x04"
+    with open(source, "rb") as fh:
+        return fh.read(4) == b"PK\x03\x04"
+
+
+def ingest_zip(upload, max_bytes=None, memory_threshold=None, max_files=None, max_total_bytes=None, used_bytes=0):
+    """
+    Unpack the PDFs of an uploaded zip into separate uploads.
+    Returns [(member name, IngestedUpload)]. Sizes are enforced on the bytes
+    actually inflated, not the sizes the archive declares, so a zip bomb
+    stops at `max_bytes` per member, and at `max_total_bytes` for the whole
+    batch (`used_bytes` of it taken by earlier files). Raises UploadTooLarge
+    past `max_files`.
+    """
+    max_bytes = config.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    memory_threshold = config.UPLOAD_MEMORY_THRESHOLD if memory_threshold is None else memory_threshold
+    max_files = config.BATCH_MAX_FILES if max_files is None else max_files
+    max_total_bytes = config.BATCH_MAX_BYTES if max_total_bytes is None else max_total_bytes
+
+    members = []
+    try:
+        with zipfile.ZipFile(upload.source) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+                    continue
+                if max_files and len(members) >= max_files:
+                    raise UploadTooLarge(f"Batch exceeds the {max_files} file limit")
+                _check_size(info.file_size, max_bytes)
+                spool = _UploadSpool(max_bytes, memory_threshold, max_total_bytes, used_bytes)
+                try:
+                    with archive.open(info) as fh:
+                        for chunk in iter(lambda: fh.read(UPLOAD_CHUNK_SIZE), b""):
+                            spool.accept(chunk)
+                            spool.write(chunk)
+                    member = spool.finish()
+                except BaseException:
+                    spool.discard()
+                    raise
+                members.append((name, member))
+                used_bytes += member.size
+    except BaseException:
+        for _, member in members:
+            member.cleanup()
+        raise
+    return members
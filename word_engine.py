@@ -0,0 +1,171 @@
+import numpy as np
+
+# Words whose tops are within this distance (chained) are on the same line,
+# the same clustering pdfplumber's text strategy uses for its row edges
+LINE_TOLERANCE = 1
+# A line further below the previous one than this many typical line gaps is
+# not part of the table (page footers)
+MAX_LINE_GAP = 1.5
+
+
+def _compact(text):
+    return "".join(text.split())
+
+
+class WordColumnLayout:
+    """
+    Extraction engine for statements whose columns are aligned text rather
+    than ruled lines. Instead of pdfplumber building synthetic edges and a
+    full table, each page's words are read once, the column boundaries are
+    taken from the header labels (`header_columns`, in order) and every word
+    is binned into a line and a column with NumPy.
+
+    Returns the same [table][row][cell] lists as page.extract_tables, starting
+    at the header row, so the bank's group_transactions is unchanged. Pages
+    without the full header fall back to extract_tables.
+    extract_fast / extract_full are the two tiers on their own (see
+    main._extract_tiered).
+    """
+
+    engine = "words"
+
+    def __init__(self, header_columns, table_settings):
+        self.labels = [_compact(label) for label in header_columns]
+        self.table_settings = table_settings
+        self.hits = 0
+        self.misses = 0
+
+    def extract_tables(self, page):
+        tables = self.extract_fast(page)
+        return tables if tables is not None else self.extract_full(page)
+
+    def extract_fast(self, page):
+        """
+        The page's table binned from its words, or None without the full header.
+        """
+        table = self._extract(page)
+        if table is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [table]
+
+    def extract_full(self, page):
+        return page.extract_tables(self.table_settings)
+
+    def _extract(self, page):
+        words = page.extract_words(return_chars=True)
+        if not words:
+            return None
+
+        n = len(words)
+        tops = np.fromiter((w["top"] for w in words), float, n)
+        x0 = np.fromiter((w["x0"] for w in words), float, n)
+        x1 = np.fromiter((w["x1"] for w in words), float, n)
+
+        # Line number of every word: sort by top, new line where the gap exceeds the tolerance
+        by_top = np.argsort(tops, kind="stable")
+        line = np.empty(n, dtype=np.intp)
+        line[by_top] = np.concatenate(([0], np.cumsum(np.diff(tops[by_top]) > LINE_TOLERANCE)))
+
+        # Reading order: line, then x
+        order = np.lexsort((x0, line))
+        starts = np.flatnonzero(np.diff(line[order], prepend=-1))
+        lines = np.split(order, starts[1:])
+
+        header = self._find_header(words, lines)
+        if header is None:
+            return None
+        header_index, bounds = header
+
+        # Column of every word from its horizontal midpoint
+        cols = np.searchsorted(bounds, (x0 + x1) / 2, side="right")
+        # Words glued across a column boundary (e.g. a wide "#" running into the
+        # date) are split char by char, as extract_tables would
+        first_char = np.fromiter(((w["chars"][0]["x0"] + w["chars"][0]["x1"]) / 2 for w in words), float, n)
+        last_char = np.fromiter(((w["chars"][-1]["x0"] + w["chars"][-1]["x1"]) / 2 for w in words), float, n)
+        straddles = np.searchsorted(bounds, first_char, side="right") != np.searchsorted(bounds, last_char, side="right")
+
+        n_cols = len(self.labels)
+        rows = [self._split_header(words, lines[header_index], bounds)]
+        for members in self._table_lines(lines, header_index, tops, cols, n_cols):
+            cells = [[] for _ in range(n_cols)]
+            for i in members:
+                if straddles[i]:
+                    for col, text in self._split_word(words[i], bounds).items():
+                        cells[col].append(text)
+                else:
+                    cells[cols[i]].append(words[i]["text"])
+            rows.append([" ".join(cell) for cell in cells])
+        return rows
+
+    def _table_lines(self, lines, header_index, tops, cols, n_cols):
+        """
+        The lines below the header that belong to the table. Every transaction
+        has words in the amount / balance (last two) columns, so the table
+        ends at the last such line, plus the wrapped lines right under it: those
+        that follow at the table's own line pitch. Page footers further down
+        ("Page 3") are not rows.
+        """
+        body = lines[header_index + 1:]
+        amounts = [k for k, members in enumerate(body) if (cols[members] >= n_cols - 2).any()]
+        if not amounts:
+            return []
+        last = amounts[-1]
+        line_tops = np.array([tops[members].min() for members in lines[header_index:]])
+        gaps = np.diff(line_tops[:last + 2])
+        pitch = np.median(gaps) if len(gaps) else 0.0
+        for k in range(last + 1, len(body)):
+            # body[k] is line_tops[k + 1]
+            if line_tops[k + 1] - line_tops[k] > pitch * MAX_LINE_GAP:
+                break
+            last = k
+        return body[:last + 1]
+
+    def _find_header(self, words, lines):
+        """
+        (line index, column boundaries) of the first line containing every
+        header label in order; each boundary is where a label's text starts.
+        Labels are matched without spaces, since header words are often
+        glued together across columns (e.g. "DATEVALUE").
+        """
+        first, last = self.labels[0], self.labels[-1]
+        for index, members in enumerate(lines):
+            compact = "".join(words[i]["text"] for i in members)
+            if first not in compact or last not in compact:
+                continue
+            char_x0 = [c["x0"] for i in members for c in words[i]["chars"]]
+            if len(char_x0) != len(compact):
+                continue
+            bounds = []
+            pos = 0
+            for label in self.labels:
+                pos = compact.find(label, pos)
+                if pos < 0:
+                    break
+                bounds.append(char_x0[pos])
+                pos += len(label)
+            else:
+                return index, np.array(bounds[1:])
+        return None
+
+    def _split_header(self, words, members, bounds):
+        """
+        Header cells, splitting glued words at the column boundaries char by char.
+        """
+        cells = [[] for _ in self.labels]
+        for i in members:
+            for col, text in self._split_word(words[i], bounds).items():
+                cells[col].append(text)
+        return [" ".join(cell) for cell in cells]
+
+    @staticmethod
+    def _split_word(word, bounds):
+        """
+        {column: text} of one word's chars.
+        """
+        fragments = {}
+        for char in word["chars"]:
+            col = int(np.searchsorted(bounds, (char["x0"] + char["x1"]) / 2, side="right"))
+            fragments[col] = fragments.get(col, "") + char["text"]
+        return fragments
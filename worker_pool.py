@@ -0,0 +1,73 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bank_registry
+import logs
+from config import config
+
+log = logging.getLogger(__name__)
+
+_pool = None
+
+
+def _warm_worker(bank_names=None):
+    """
+    Pool initializer: import pdfplumber and the bank parsers up front
+    (PARSE_PRELOAD_BANKS, or every registered bank) so no request pays for it.
+    """
+    import pdfplumber  # noqa: F401
+
+    # Process workers log through their own queue handler
+    logs.setup()
+    bank_registry.preload(bank_names)
+
+
+def _ping():
+    return True
+
+
+def start(mode=None, max_workers=None):
+    """
+    Create the shared parser pool (called once from the app lifespan).
+    Returns None when pages are parsed inline.
+    """
+    global _pool
+    mode = mode or config.PARSE_EXECUTOR
+    max_workers = max_workers or config.PARSE_MAX_WORKERS
+
+    if _pool is not None or mode == "inline":
+        return _pool
+
+    if mode == "process":
+        _pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(config.PARSE_START_METHOD),
+            initializer=_warm_worker,
+            initargs=(config.PARSE_PRELOAD_BANKS,),
+        )
+    else:
+        _pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="parser",
+            initializer=_warm_worker,
+            initargs=(config.PARSE_PRELOAD_BANKS,),
+        )
+
+    # Force every worker to start (and run its initializer) before the first request
+    for future in [_pool.submit(_ping) for _ in range(max_workers)]:
+        future.result()
+
+    log.info("🔥 Parser pool ready: %s x %s", mode, max_workers)
+    return _pool
+
+
+def get_pool():
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None